@@ -10,17 +10,33 @@ load_dotenv(override=True)
 REPO_PATH = os.getenv('REPO_PATH')
 REPO = os.getenv('REPO')
 MAIN_BRANCH = os.getenv('MAIN_BRANCH')
-VIRTUAL_ENVIRONMENT_PATH = os.getenv('VIRTUAL_ENVIRONMENT_PATH')
 storage_path = os.getenv('STORAGE_PATH') + '/branches.csv'
+# "full" stores the commit list of each branch in branches.csv, "summary" only their number (commit_count)
+BRANCH_DATA_MODE = os.getenv('BRANCH_DATA_MODE', 'full').lower()
+# The commits of all branches as one branch_name,commit_sha row each, only written on request
+BRANCH_COMMITS_EXPORT = os.getenv('BRANCH_COMMITS_EXPORT', 'false').lower() == 'true'
+commits_path = os.getenv('STORAGE_PATH') + '/branch_commits.csv'
+WORKERS = int(os.getenv('BRANCH_WORKERS', 1))
 
-# Retrieve Branches
-branches = retrieve_branch_data_new(repo_path=REPO_PATH, main_branch=MAIN_BRANCH, path_to_environment=VIRTUAL_ENVIRONMENT_PATH)
+# Worker processes import this script again on some platforms, they must not run the retrieval themselves
+if __name__ == "__main__":
+    # Retrieve Branches
+    branches = retrieve_branch_data_new(
+        repo_path=REPO_PATH,
+        main_branch=MAIN_BRANCH,
+        summary=BRANCH_DATA_MODE == 'summary',
+        commits_path=commits_path if BRANCH_COMMITS_EXPORT else None,
+        workers=WORKERS
+    )
 
-# Store
-df = pd.DataFrame(branches)
-if len(df) > 0:
-    # df = replace_all_user_occurences(df, REPO_PATH)
+    # Store
+    df = pd.DataFrame(branches)
+    if 'commit_count' in df:
+        # Fast-forwarded branches have no count, which would turn the others into floats
+        df['commit_count'] = df['commit_count'].astype('Int64')
+    if len(df) > 0:
+        # df = replace_all_user_occurences(df, REPO_PATH)
     
-    df.to_csv(storage_path, index=False)
-else:
-    logging.warning(f"No branches found for {REPO}.")
+        df.to_csv(storage_path, index=False)
+    else:
+        logging.warning(f"No branches found for {REPO}.")
@@ -3,7 +3,7 @@ import json
 import pandas as pd
 from dotenv import load_dotenv
 from helper.api_access import retrieve_workflow_runs, retrieve_via_url
-from helper.general_purpose import substract_and_format_time, transform_time
+from helper.general_purpose import transform_time_column, format_time_difference_column
 from helper.anonymizer import replace_all_user_occurences
 import logging
 load_dotenv(override=True)
@@ -56,18 +56,9 @@ def get_github_run_values(run):
     if missing_keys:
         logging.debug(f"Missing keys in run {run_id}: {', '.join(missing_keys)}")
     
-    created_at = transform_time(get_time("created_at"))
-    updated_at = transform_time(get_time("updated_at"))
-    
-    time_until_completed = None
-    try:
-        if (status == "completed" and conclusion != "N/A") or (created_at != None and completed_at != None and conclusion != "N/A"):
-            completed_at = updated_at
-            time_until_completed = substract_and_format_time(created_at, completed_at)
-        elif (created_at != None and updated_at != None):
-            time_until_completed = substract_and_format_time(created_at, updated_at)
-    except Exception as e:
-        logging.error(f"Error processing run {run_id}: {e}")
+    # Times are parsed for all runs at once in transform_run_times
+    created_at = get_time("created_at")
+    updated_at = get_time("updated_at")
     
     return {
         "run_id": run_id,
@@ -80,7 +71,7 @@ def get_github_run_values(run):
         "created_at": created_at,
         "last_updated_at": updated_at,
         "author": author,
-        "time_until_updated": time_until_completed,
+        "time_until_updated": None,
     }
     
 def get_value(run, key, default="N/A"):
@@ -109,16 +100,9 @@ def get_gitlab_run_values(run):
     if missing_keys:
         logging.debug(f"Missing keys in run {run_id}: {', '.join(missing_keys)}")
     
-    created_at = transform_time(get_time("created_at"))
-    updated_at = transform_time(get_time("updated_at"))
-    
-    time_until_completed = None
-    try:
-        if created_at and updated_at:
-            completed_at = updated_at
-            time_until_completed = substract_and_format_time(created_at, completed_at)
-    except Exception as e:
-        logging.error(f"Error processing run {run_id}: {e}")
+    # Times are parsed for all runs at once in transform_run_times
+    created_at = get_time("created_at")
+    updated_at = get_time("updated_at")
     
     return {
         "run_id": run_id,
@@ -131,7 +115,7 @@ def get_gitlab_run_values(run):
         "created_at": created_at,
         "last_updated_at": updated_at,
         "author": None,
-        "time_until_updated": time_until_completed,
+        "time_until_updated": None,
     }
     
 def get_azure_run_values(pipelines):
@@ -155,8 +139,6 @@ def get_azure_run_values(pipelines):
                 runs = [runs["value"]]
             for runcountvalue in runs:
                 for run in runcountvalue["value"]:
-                    createdDate = transform_time(run["createdDate"])
-                    finishedDate = transform_time(run["finishedDate"])
                     results.append(
                         {
                             "run_id": run['id'],
@@ -166,13 +148,34 @@ def get_azure_run_values(pipelines):
                             "conclusion": run["result"],
                             "related_commit": "Not/Azure",
                             "attempts": "Not/Azure",
-                            "created_at": createdDate,
-                            "last_updated_at": finishedDate,
+                            "created_at": run["createdDate"],
+                            "last_updated_at": run["finishedDate"],
                             "author": "Not/Azure",
-                            "time_until_updated": substract_and_format_time(createdDate, finishedDate) if run["finishedDate"] and run["createdDate"] else "N/A",
+                            "time_until_updated": None,
                         }
                     )
-    return results
+    return transform_run_times(results, lambda df: df["created_at"].astype(bool) & df["last_updated_at"].astype(bool), "N/A")
+
+def transform_run_times(results, has_duration, default=None):
+    """
+    Parse the creation and update times of all runs at once and calculate the time until updated.
+
+    :param results: The formatted runs with the raw time strings in "created_at" and "last_updated_at".
+    :param has_duration: Function returning a boolean Series for the runs that get a time until updated.
+    :param default: Value for the runs without time until updated.
+    :return: The runs as a DataFrame; times that could not be parsed keep their original value.
+    """
+    df = pd.DataFrame(results)
+    if len(df) == 0:
+        return df
+
+    created_at = transform_time_column(df["created_at"], source=f"{MODE}-runs")
+    updated_at = transform_time_column(df["last_updated_at"], source=f"{MODE}-runs")
+
+    df["time_until_updated"] = format_time_difference_column(created_at, updated_at).where(has_duration(df), default)
+    df["created_at"] = created_at.astype(object).where(created_at.notna(), df["created_at"])
+    df["last_updated_at"] = updated_at.astype(object).where(updated_at.notna(), df["last_updated_at"])
+    return df
     
 
 if MODE == "azure" and workflow_runs != {} and workflow_runs != []:
@@ -197,6 +200,11 @@ else:
         elif MODE == "gitlab":
             results.append(get_gitlab_run_values(run))
 
+    if MODE == "github":
+        results = transform_run_times(results, lambda df: (df["status"] == "completed") & (df["conclusion"] != "N/A"))
+    elif MODE == "gitlab":
+        results = transform_run_times(results, lambda df: df["created_at"].astype(bool) & df["last_updated_at"].astype(bool))
+
 # Store
 df = pd.DataFrame(results)
 
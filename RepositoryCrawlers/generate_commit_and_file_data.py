@@ -0,0 +1,68 @@
+from helper.git_console_access import iter_all_commits_with_files, retrieve_change_line_count, retrieve_ref_tips, build_line_count_skip_rules
+from helper.general_purpose import write_csv_in_chunks, export_jsonl_as_json
+from helper.blob_cache import BlobStatsCache
+from dotenv import load_dotenv
+import os
+import json
+import logging
+
+load_dotenv(override=True)
+
+REPO_PATH = os.getenv('REPO_PATH')
+STORAGE_PATH = os.getenv('STORAGE_PATH')
+REPO = os.getenv('REPO')
+CHUNK_SIZE = int(os.getenv('COMMIT_CHUNK_SIZE', 10000))
+# Line counts are cached by blob SHA, so the cache can be shared by several repositories
+BLOB_STATS_CACHE_PATH = os.getenv('BLOB_STATS_CACHE_PATH', STORAGE_PATH + '/blob_stats.sqlite')
+# files.jsonl is always written, the single files.json array only on request
+FILES_JSON_EXPORT = os.getenv('FILES_JSON_EXPORT', 'false').lower() == 'true'
+store_path = STORAGE_PATH + "/commits.csv"
+files_path = STORAGE_PATH + "/files.jsonl"
+# Contents that are not read to count lines, the same settings as in generate_file_data.py
+SKIP_RULES = build_line_count_skip_rules(
+    file_endings=os.getenv('FILE_SKIP_ENDINGS', ''),
+    path_patterns=os.getenv('FILE_SKIP_PATHS', ''),
+    skip_binary=os.getenv('FILE_SKIP_BINARY', 'false').lower() == 'true',
+    max_size=int(os.getenv('FILE_MAX_CONTENT_SIZE', 0))
+)
+# Same watermark as generate_commit_data.py, so a later incremental commit crawl continues from this one
+watermark_path = STORAGE_PATH + "/.commits_watermark.json"
+
+def iter_commits_writing_files(files_file):
+    """
+    Iterate over the commits of one `git log` traversal, writing their file changes to files.jsonl on the way.
+    """
+    for commit, file_changes in iter_all_commits_with_files(REPO_PATH):
+        commit_files = []
+        for change in file_changes:
+            # Count lines of the file after the commit
+            line_count, skip_reason = retrieve_change_line_count(change, REPO_PATH, cache=blob_stats_cache, skip_rules=SKIP_RULES)
+
+            commit_files.append(change | {
+                "line_count": line_count,
+                "line_count_skip_reason": skip_reason
+            })
+
+        files_file.write(json.dumps({
+            "commit_sha": commit["sha"],
+            "commit_files": commit_files
+        }, separators=(',', ':')) + '\n')
+        yield commit
+
+# Tips are taken before the traversal, so commits added meanwhile are picked up by the next incremental crawl
+current_tips = retrieve_ref_tips(REPO_PATH)
+
+if not os.path.exists(STORAGE_PATH):
+    os.makedirs(STORAGE_PATH)
+
+with BlobStatsCache(BLOB_STATS_CACHE_PATH) as blob_stats_cache, open(files_path, 'w') as files_file:
+    commit_count = write_csv_in_chunks(iter_commits_writing_files(files_file), store_path, chunk_size=CHUNK_SIZE)
+if commit_count == 0:
+    logging.warning(f"No Commits found for {REPO}.")
+else:
+    with open(watermark_path + ".tmp", 'w') as f:
+        json.dump({'tips': current_tips}, f)
+    os.replace(watermark_path + ".tmp", watermark_path)
+
+if FILES_JSON_EXPORT:
+    export_jsonl_as_json(files_path, STORAGE_PATH + "/files.json")
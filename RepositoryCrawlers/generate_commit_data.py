@@ -1,8 +1,10 @@
-from helper.git_console_access import retrieve_all_commits_with_stats_and_logging
+from helper.git_console_access import iter_all_commits_with_stats, iter_all_commits_with_stats_parallel, retrieve_ref_tips, is_history_rewritten
+from helper.general_purpose import write_csv_in_chunks
 from helper.anonymizer import replace_all_user_occurences
-import pandas as pd
 from dotenv import load_dotenv
 import os
+import json
+import shutil
 import logging
 
 load_dotenv(override=True)
@@ -10,16 +12,84 @@ load_dotenv(override=True)
 REPO_PATH = os.getenv('REPO_PATH')
 STORAGE_PATH = os.getenv('STORAGE_PATH')
 REPO = os.getenv('REPO')
+CHUNK_SIZE = int(os.getenv('COMMIT_CHUNK_SIZE', 10000))
+CRAWL_MODE = os.getenv('COMMIT_CRAWL_MODE', 'full')
+WORKERS = int(os.getenv('COMMIT_WORKERS', 1))
 store_path = STORAGE_PATH + "/commits.csv"
+# Hidden file, so it is not copied along with the results by anonymize_all.py
+watermark_path = STORAGE_PATH + "/.commits_watermark.json"
 
-# Get all Commits
-commit_list = retrieve_all_commits_with_stats_and_logging(REPO_PATH)
+def iter_commits(revisions=None):
+    """
+    Iterate over the commits of the given revisions (all refs by default), sharded over several Git processes if configured.
+    """
+    if WORKERS > 1:
+        return iter_all_commits_with_stats_parallel(REPO_PATH, revisions=revisions, workers=WORKERS)
+    return iter_all_commits_with_stats(REPO_PATH, revisions=revisions)
 
-df = pd.DataFrame(commit_list)
+def load_watermark():
+    """
+    Load the ref tips stored by the previous crawl, if an incremental crawl is possible.
 
-if len(df) > 0:
-    # df = replace_all_user_occurences(df,REPO_PATH)
-    
-    df.to_csv(store_path, index=False)
-else:
-    logging.warning(f"No Commits found for {REPO}.")
+    :return: The list of ref tips, or None if a full crawl is required.
+    :rtype: list or None
+    """
+    if CRAWL_MODE != 'incremental' or not os.path.exists(store_path) or not os.path.exists(watermark_path):
+        return None
+    with open(watermark_path, 'r') as f:
+        return json.load(f).get('tips')
+
+def prepend_new_commits(revisions):
+    """
+    Write the commits of the given revisions in front of the existing commits.csv.
+
+    New commits are usually the most recent ones, so keeping them first preserves the newest-first order of `git log`.
+    The existing rows are only kept if commits.csv has the same columns in the same order, e.g. not if it was written
+    by an older version of the crawler.
+
+    :return: The number of new commits, or None if the columns of commits.csv differ and a full crawl is required.
+    :rtype: int or None
+    """
+    new_path = store_path + ".new"
+    commit_count = write_csv_in_chunks(iter_commits(revisions), new_path, chunk_size=CHUNK_SIZE)
+    if commit_count == 0:
+        return 0
+
+    with open(store_path, 'rb') as old_file:
+        with open(new_path, 'rb') as new_file:
+            new_header = new_file.readline()
+        if old_file.readline() != new_header:
+            os.remove(new_path)
+            return None
+        with open(new_path, 'ab') as new_file:
+            shutil.copyfileobj(old_file, new_file)
+    os.replace(new_path, store_path)
+    return commit_count
+
+# Get all Commits, written in chunks while the history is traversed
+current_tips = retrieve_ref_tips(REPO_PATH)
+previous_tips = load_watermark()
+
+if previous_tips is not None and is_history_rewritten(previous_tips, current_tips, REPO_PATH):
+    logging.info(f"History of {REPO} was rewritten since the last crawl, falling back to a full crawl.")
+    previous_tips = None
+
+if previous_tips is not None:
+    # Only traverse commits that are reachable from the new tips but not from the old ones
+    revisions = current_tips + [f"^{tip}" for tip in previous_tips]
+    commit_count = prepend_new_commits(revisions)
+    if commit_count is None:
+        logging.info(f"Columns of {store_path} differ from the current ones, falling back to a full crawl.")
+        previous_tips = None
+    else:
+        logging.info(f"Added {commit_count} new commits for {REPO}.")
+
+if previous_tips is None:
+    commit_count = write_csv_in_chunks(iter_commits(), store_path, chunk_size=CHUNK_SIZE)
+    if commit_count == 0:
+        logging.warning(f"No Commits found for {REPO}.")
+
+if commit_count > 0 or previous_tips is not None:
+    with open(watermark_path + ".tmp", 'w') as f:
+        json.dump({'tips': current_tips}, f)
+    os.replace(watermark_path + ".tmp", watermark_path)
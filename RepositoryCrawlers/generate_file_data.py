@@ -1,7 +1,11 @@
-from helper.git_console_access import retrieve_commit_file_changes, retrieve_file_content
+from helper.git_console_access import iter_commit_files_bulk, iter_commit_files_parallel, build_line_count_skip_rules, build_pathspecs
+from helper.blob_cache import BlobStatsCache
+from helper.general_purpose import write_jsonl, iter_jsonl, recover_jsonl, export_jsonl_as_json, sample_commits
 import pandas as pd
+import hashlib
 import json
 import os
+import time
 import pandas as pd
 from dotenv import load_dotenv
 import logging
@@ -11,56 +15,186 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-invalid_file_endings = ['.png', '.svg', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.ico']
-
 load_dotenv(override=True)
 
 REPO_PATH = os.getenv('REPO_PATH')
 
 STORAGE_PATH = os.getenv('STORAGE_PATH')
-commits = pd.read_csv(STORAGE_PATH + '/commits.csv')
-
-logging.info("Initializing retrieval of abstract file data.")
-
-files = []
-counter = 0
-for _, commit in commits.iterrows():
-    counter += 1
-    
-    # Update-Logs
-    if counter % 100 == 0:
-        logging.info(f"Processed {counter} of {len(commits)} commits for file-level information.")
-        
-    commit_sha = commit["sha"]
-    # Retrieve file changes for the current commit
-    file_changes = retrieve_commit_file_changes(commit_sha, REPO_PATH)
-    
-    commit_files = []
-    for change in file_changes:
-        file_path = change["file_path"]
-        
-        # if any(file_path.endswith(ending) for ending in invalid_file_endings):
-        #     continue
-        
-        # Retrieve file content to calculate line count
-        file_content = retrieve_file_content(commit_sha, file_path, REPO_PATH)
-        if file_content:
-            # Count lines by splitting at line breaks
-            line_count = file_content.count('\n') + (1 if file_content else 0)
+# Line counts are cached by blob SHA, so the cache can be shared by several repositories
+BLOB_STATS_CACHE_PATH = os.getenv('BLOB_STATS_CACHE_PATH', STORAGE_PATH + '/blob_stats.sqlite')
+WORKERS = int(os.getenv('FILE_WORKERS', 1))
+# files.jsonl is always written, the single files.json array only on request
+FILES_JSON_EXPORT = os.getenv('FILES_JSON_EXPORT', 'false').lower() == 'true'
+# "content" counts the lines of every changed file from its content, "diff" derives them from the previous count and
+# the lines added and removed, which needs far fewer reads but processes the commits oldest first and in one process.
+# Derived counts include leading and trailing blank lines and are stored as physical_line_count instead of line_count.
+LINE_COUNT_MODE = os.getenv('FILE_LINE_COUNT_MODE', 'content').lower()
+# Contents that are not read to count lines, the reason is stored in line_count_skip_reason
+SKIP_RULES = build_line_count_skip_rules(
+    file_endings=os.getenv('FILE_SKIP_ENDINGS', ''),
+    path_patterns=os.getenv('FILE_SKIP_PATHS', ''),
+    skip_binary=os.getenv('FILE_SKIP_BINARY', 'false').lower() == 'true',
+    max_size=int(os.getenv('FILE_MAX_CONTENT_SIZE', 0))
+)
+
+# Paths left out of the file-level data entirely, e.g. vendored or generated trees, passed to Git as pathspecs
+PATHSPECS = build_pathspecs(
+    include_paths=os.getenv('FILE_INCLUDE_PATHS', ''),
+    exclude_paths=os.getenv('FILE_EXCLUDE_PATHS', '')
+)
+
+# Only a sample of the commits is processed if set to "uniform", "stratified" (by month) or "budget" (newest first
+# until FILE_TIME_BUDGET seconds are used up), see `sample_commits`. Each record then has a sampling_weight.
+SAMPLING_MODE = os.getenv('FILE_SAMPLING_MODE', 'none').lower()
+SAMPLE_RATE = float(os.getenv('FILE_SAMPLE_RATE', 0.1))
+SAMPLE_SEED = int(os.getenv('FILE_SAMPLE_SEED', 0))
+TIME_BUDGET = float(os.getenv('FILE_TIME_BUDGET', 3600))
+sampling_path = STORAGE_PATH + '/files_sampling.json'
+
+# Records of finished commits are appended to the journal, which becomes files.jsonl once all commits are done.
+# The settings file identifies the run, a journal written with other settings or for other commits is discarded.
+JOURNAL_PATH = STORAGE_PATH + '/files.jsonl.partial'
+JOURNAL_SETTINGS_PATH = STORAGE_PATH + '/.files_journal.json'
+# Records after which the journal is flushed to disk, at most this many commits are retrieved again after a crash
+JOURNAL_SYNC_INTERVAL = 1000
+
+def iter_commit_files(commit_shas, line_count_state=None):
+    """
+    Iterate over the file changes of the given commits in their order, spread over several processes if configured.
+    """
+    if LINE_COUNT_MODE == "diff":
+        if WORKERS > 1:
+            logging.warning("FILE_LINE_COUNT_MODE=diff processes the commits in order, FILE_WORKERS is ignored.")
+        if line_count_state is None:
+            line_count_state = {}
+        with BlobStatsCache(BLOB_STATS_CACHE_PATH) as blob_stats_cache:
+            yield from iter_commit_files_bulk(commit_shas, REPO_PATH, cache=blob_stats_cache, skip_rules=SKIP_RULES, line_count_state=line_count_state, pathspecs=PATHSPECS)
+        return
+
+    if WORKERS > 1:
+        yield from iter_commit_files_parallel(commit_shas, REPO_PATH, workers=WORKERS, cache_path=BLOB_STATS_CACHE_PATH, skip_rules=SKIP_RULES, pathspecs=PATHSPECS)
+        return
+
+    with BlobStatsCache(BLOB_STATS_CACHE_PATH) as blob_stats_cache:
+        yield from iter_commit_files_bulk(commit_shas, REPO_PATH, cache=blob_stats_cache, skip_rules=SKIP_RULES, pathspecs=PATHSPECS)
+
+def iter_file_records(commit_shas, total_count, done_count=0, line_count_state=None, sampling_weights=None, deadline=None):
+    """
+    Iterate over the files.jsonl records of the given commits, logging the progress.
+
+    Stops early once `time.monotonic()` passes the deadline, if one is given.
+    """
+    counter = done_count
+    for commit_sha, commit_files in iter_commit_files(commit_shas, line_count_state=line_count_state):
+        counter += 1
+
+        # Update-Logs
+        if counter % 100 == 0:
+            logging.info(f"Processed {counter} of {total_count} commits for file-level information.")
+
+        if sampling_weights is None:
+            yield {
+                "commit_sha": commit_sha,
+                "commit_files": commit_files
+            }
         else:
-            line_count = 0
-
-        commit_files.append(change |{
-            "line_count": line_count
-        })
-
-    files.append({
-        "commit_sha": commit_sha,
-        "commit_files": commit_files
-    })
-
-# Save as JSON, create folder if not exists
-if not os.path.exists(STORAGE_PATH):
-    os.makedirs(STORAGE_PATH)
-with open(STORAGE_PATH + "/files.json", "w") as f:
-    json.dump(files, f, indent=4)
+            yield {
+                "commit_sha": commit_sha,
+                "sampling_weight": sampling_weights[commit_sha],
+                "commit_files": commit_files
+            }
+
+        if deadline is not None and time.monotonic() >= deadline:
+            logging.info(f"Time budget used up after {counter} of {total_count} commits.")
+            return
+
+# Worker processes import this script again on some platforms, they must not run the retrieval themselves
+if __name__ == "__main__":
+    commits = pd.read_csv(STORAGE_PATH + '/commits.csv')
+
+    logging.info("Initializing retrieval of abstract file data.")
+
+    if not os.path.exists(STORAGE_PATH):
+        os.makedirs(STORAGE_PATH)
+
+    sampling_weights = None
+    if SAMPLING_MODE != "none":
+        sample = sample_commits(commits, SAMPLING_MODE, rate=SAMPLE_RATE, seed=SAMPLE_SEED)
+        sampling_weights = dict(zip(sample["sha"], sample["sampling_weight"]))
+        commit_shas = sample["sha"]
+        logging.info(f"Sampled {len(sample)} of {len(commits)} commits ({SAMPLING_MODE}).")
+    else:
+        commit_shas = commits["sha"]
+
+    if LINE_COUNT_MODE == "diff" and SAMPLING_MODE != "budget":
+        # commits.csv is newest first, the counts are derived from the parents' counts
+        commit_shas = commit_shas[::-1]
+
+    # Continue a journal of an earlier run with the same settings and commits, commits.csv may have been crawled again
+    commits_fingerprint = hashlib.sha256("\n".join(commit_shas).encode()).hexdigest()
+    journal_settings = json.loads(json.dumps({
+        "repo_path": REPO_PATH,
+        "commits": [len(commit_shas), commits_fingerprint],
+        "line_count_mode": LINE_COUNT_MODE,
+        "skip_rules": SKIP_RULES,
+        "pathspecs": PATHSPECS,
+        "sampling": [SAMPLING_MODE, SAMPLE_RATE, SAMPLE_SEED]
+    }))
+    done_shas = set()
+    line_count_state = {} if LINE_COUNT_MODE == "diff" else None
+    if os.path.exists(JOURNAL_PATH) and os.path.exists(JOURNAL_SETTINGS_PATH):
+        with open(JOURNAL_SETTINGS_PATH, 'r') as f:
+            previous_settings = json.load(f)
+        if previous_settings == journal_settings:
+            recover_jsonl(JOURNAL_PATH)
+            for record in iter_jsonl(JOURNAL_PATH):
+                done_shas.add(record["commit_sha"])
+                # Replay the counts of the finished commits, so the following ones can be derived from them
+                if line_count_state is not None:
+                    for commit_file in record["commit_files"]:
+                        if commit_file["file_sha"] and commit_file["physical_line_count"] is not None:
+                            line_count_state[commit_file["file_path"]] = (commit_file["file_sha"], commit_file["physical_line_count"])
+                        else:
+                            line_count_state.pop(commit_file["file_path"], None)
+            logging.info(f"Resuming after {len(done_shas)} commits found in {JOURNAL_PATH}.")
+        else:
+            logging.warning(f"Discarding {JOURNAL_PATH}, it was written with other settings or commits.")
+
+    if not done_shas:
+        with open(JOURNAL_PATH, 'w'):
+            pass
+        with open(JOURNAL_SETTINGS_PATH, 'w') as f:
+            json.dump(journal_settings, f)
+
+    # Save as JSON Lines while the commits are processed
+    remaining_shas = [commit_sha for commit_sha in commit_shas if commit_sha not in done_shas]
+    # A resumed budget run gets the full budget again
+    deadline = time.monotonic() + TIME_BUDGET if SAMPLING_MODE == "budget" else None
+    written = write_jsonl(
+        iter_file_records(remaining_shas, len(commit_shas), done_count=len(commit_shas) - len(remaining_shas), line_count_state=line_count_state, sampling_weights=sampling_weights, deadline=deadline),
+        JOURNAL_PATH,
+        append=True,
+        sync_interval=JOURNAL_SYNC_INTERVAL
+    )
+    os.replace(JOURNAL_PATH, STORAGE_PATH + "/files.jsonl")
+    os.remove(JOURNAL_SETTINGS_PATH)
+
+    # Describe the sample, so aggregates can be weighted and the covered period is known
+    if SAMPLING_MODE != "none":
+        processed_count = len(done_shas) + written
+        summary = {
+            "mode": SAMPLING_MODE,
+            "rate": SAMPLE_RATE if SAMPLING_MODE != "budget" else None,
+            "seed": SAMPLE_SEED if SAMPLING_MODE != "budget" else None,
+            "time_budget": TIME_BUDGET if SAMPLING_MODE == "budget" else None,
+            "population_count": len(commits),
+            "sample_count": len(commit_shas),
+            "processed_count": processed_count,
+            # Budget runs process the commits newest first, so the processed ones are complete back to this date
+            "covered_since": str(sample["date"].iloc[processed_count - 1]) if SAMPLING_MODE == "budget" and processed_count else None
+        }
+        with open(sampling_path, 'w') as f:
+            json.dump(summary, f, indent=4)
+
+    if FILES_JSON_EXPORT:
+        export_jsonl_as_json(STORAGE_PATH + "/files.jsonl", STORAGE_PATH + "/files.json")
@@ -2,7 +2,7 @@ import os
 from datetime import datetime
 import pandas as pd
 from dotenv import load_dotenv
-from helper.general_purpose import substract_and_format_time, transform_time, get_user_name_azure
+from helper.general_purpose import transform_time_column, format_time_difference_column, get_user_name_azure
 from helper.api_access import retrieve_issues_parallel
 from helper.anonymizer import replace_all_user_occurences
 import logging
@@ -87,34 +87,35 @@ results = []
 counter = 0
 if issues:
     length = len(issues)
+    issues = [issue for issue in issues if issue and not ('user' in issue and issue['user']['login'] in BOT_USERS)]
+
+    # Parse all creation and closing times at once
+    if MODE == "azure":
+        created_at = [issue['fields']['System.CreatedDate'][:-1] for issue in issues]
+        closed_at = [None if issue['fields'].get('Microsoft.VSTS.Common.ClosedDate') is None else issue['fields']['Microsoft.VSTS.Common.ClosedDate'][:-1] for issue in issues]
+    else:
+        created_at = [issue['created_at'][:-1] for issue in issues]
+        closed_at = [None if issue['closed_at'] is None else issue['closed_at'][:-1] for issue in issues]
+
+    # Calculate time until closed
+    time_until_closed = format_time_difference_column(
+        transform_time_column(created_at, source=f"{MODE}-issues"),
+        transform_time_column(closed_at, source=f"{MODE}-issues")
+    )
+    time_until_closed = time_until_closed.where([bool(closed) for closed in closed_at], "N/A")
 
     # Format Issues
-    for issue in issues:
+    for issue, issue_time_until_closed in zip(issues, time_until_closed):
         counter += 1
         if counter % 100 == 0:
             logging.info(f"Processed {counter} of {length} issues")
-        if not issue or ('user' in issue and issue['user']['login'] in BOT_USERS):
-            continue
-        
-        if MODE == "azure":
-            created_at = transform_time(issue['fields']['System.CreatedDate'][:-1])
-            closed_at = None if issue['fields'].get('Microsoft.VSTS.Common.ClosedDate') is None else transform_time(issue['fields']['Microsoft.VSTS.Common.ClosedDate'][:-1])
-        else:
-            created_at = transform_time(issue['created_at'][:-1])
-            closed_at = None if issue['closed_at'] is None else transform_time(issue['closed_at'][:-1])
-        issue_id = issue['id']
-
-        # Calculate time until closed
-        time_until_closed = "N/A"
-        if closed_at:
-            time_until_closed = substract_and_format_time(created_at, closed_at)
 
         if MODE == 'github':
-            formatted_issue = format_issue_for_github(issue, time_until_closed=time_until_closed)
+            formatted_issue = format_issue_for_github(issue, time_until_closed=issue_time_until_closed)
         elif MODE == 'gitlab':
-            formatted_issue = format_issue_for_gitlab(issue, time_until_closed)
+            formatted_issue = format_issue_for_gitlab(issue, issue_time_until_closed)
         elif MODE == 'azure':
-            formatted_issue = format_issue_for_azure(issue, time_until_closed)
+            formatted_issue = format_issue_for_azure(issue, issue_time_until_closed)
         else:
             raise ValueError(f"Unsupported MODE for issue retrieval: {MODE}")
             
@@ -3,7 +3,7 @@ from datetime import datetime
 import pandas as pd
 from dotenv import load_dotenv
 from helper.git_console_access import run_git_command, retrieve_pull_requests_parallel
-from helper.general_purpose import transform_time, substract_and_format_time, get_user_name_azure
+from helper.general_purpose import substract_and_format_time, transform_time_column, format_time_difference_column, get_user_name_azure
 from helper.api_access import retrieve_pull_request_details, retrieve_pull_requests_gitlab, retrieve_pull_requests_azure
 from helper.anonymizer import replace_all_user_occurences
 import logging
@@ -155,24 +155,6 @@ for pull_request in pull_requests:
     if not pr_details:
         continue
     
-    created_at = transform_time(pr_details['created_at'])
-
-    # Calculate time until closed and merged
-    time_until_closed = None
-    if pr_details.get('closed_at'):
-        start = transform_time(pr_details['created_at'])
-        closed_at = transform_time(pr_details['closed_at'])
-        time_until_closed = substract_and_format_time(start, closed_at)
-    
-    time_until_merged = None
-    if pr_details.get('merged_at'):
-        start = transform_time(pr_details['created_at'])
-        merged_at = transform_time(pr_details['merged_at'])
-        time_until_merged = substract_and_format_time(start, merged_at)
-    
-    pr_details['time_until_closed'] = time_until_closed if pr_details.get('closed_at') else None
-    pr_details['time_until_merged'] = time_until_merged if pr_details.get('merged_at') else None
-    
     results.append(pr_details)
     
     counter+=1
@@ -202,8 +184,16 @@ for pull_request in pull_requests:
 #                 logging.error(f"Error decoding JSON from {intermediate_file}: {e}")
 
 
-# Store
+# Calculate time until closed and merged for all pull requests at once
 df = pd.DataFrame(results)
+if len(df) > 0:
+    created_at = transform_time_column(df['created_at'], source=f"{MODE}-pull-requests")
+    for column in ['closed', 'merged']:
+        end = transform_time_column(df[f'{column}_at'], source=f"{MODE}-pull-requests")
+        has_end = [bool(value) for value in df[f'{column}_at']]
+        df[f'time_until_{column}'] = format_time_difference_column(created_at, end).where(has_end, None)
+
+# Store
 df = df.astype(str)
 df = df.drop_duplicates()
 
@@ -1,6 +1,6 @@
 import re
 from .general_purpose import hash_string_sha256
-from .git_console_access import run_git_command
+from .git_console_access import iter_git_command_lines
 import pandas as pd
 import json
 
@@ -24,8 +24,8 @@ def get_local_git_users(repo_path=None):
     users = {}
 
     # Get all unique commit authors and their emails
-    git_output = run_git_command(['log', '--format=%aN <%aE>', '--all'], repo_path=repo_path)
-    git_output = sorted(set(git_output.splitlines()), key=str.casefold)  # Remove duplicates and sort
+    git_output = iter_git_command_lines(['log', '--format=%aN <%aE>', '--all'], repo_path=repo_path)
+    git_output = sorted(set(git_output), key=str.casefold)  # Remove duplicates while streaming and sort
 
     if git_output:
         for line in git_output:  # Ensure no duplicate lines are processed
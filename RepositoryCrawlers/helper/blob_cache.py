@@ -0,0 +1,105 @@
+import sqlite3
+import logging
+import os
+import threading
+
+########################## Blob Stats Cache
+"""
+Persistent cache for statistics of file contents (blobs), keyed by their SHA.
+
+Blobs are content-addressed, so the statistics of a SHA never change and one cache file can be shared by all runs
+and repositories.
+"""
+
+class BlobStatsCache:
+    """
+    SQLite-backed mapping from blob SHA to line count and size in bytes.
+
+    Inserts are committed in batches; call `flush` (or `close`, or use the cache as a context manager) to persist the
+    remaining ones. Several processes may use the same file at once.
+
+    :param path: Path to the SQLite database file, created if it does not exist.
+    :type path: str
+    :param commit_interval: Number of inserts after which they are committed, defaults to 1000.
+    :type commit_interval: int, optional
+    """
+
+    def __init__(self, path, commit_interval=1000):
+        self.path = path
+        self.commit_interval = commit_interval
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS blob_stats (sha TEXT PRIMARY KEY, line_count INTEGER NOT NULL, size INTEGER NOT NULL) WITHOUT ROWID"
+        )
+        self._connection.commit()
+
+    def get(self, blob_sha):
+        """
+        Look up the statistics of a blob.
+
+        :param blob_sha: The SHA of the blob.
+        :type blob_sha: str
+
+        :return: A dictionary with the keys line_count and size, or None if the blob is not cached.
+        :rtype: dict or None
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT line_count, size FROM blob_stats WHERE sha = ?", (blob_sha,)).fetchone()
+        if row is None:
+            return None
+        return {"line_count": row[0], "size": row[1]}
+
+    def put(self, blob_sha, line_count, size):
+        """
+        Store the statistics of a blob.
+
+        :param blob_sha: The SHA of the blob.
+        :type blob_sha: str
+        :param line_count: The number of lines of the blob.
+        :type line_count: int
+        :param size: The size of the blob in bytes.
+        :type size: int
+        """
+        with self._lock:
+            self._connection.execute("INSERT OR IGNORE INTO blob_stats VALUES (?, ?, ?)", (blob_sha, line_count, size))
+            self._pending += 1
+            if self._pending >= self.commit_interval:
+                self._commit()
+
+    def flush(self):
+        """
+        Commit all pending inserts.
+        """
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        """
+        Commit all pending inserts and close the database.
+        """
+        self.flush()
+        self._connection.close()
+
+    def _commit(self):
+        try:
+            self._connection.commit()
+        except sqlite3.OperationalError as e:
+            # Another process held the lock for too long, the inserts are retried with the next commit
+            logging.warning(f"Could not write blob stats cache {self.path}: {e}")
+            return
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,357 @@
+import array
+import heapq
+import itertools
+from datetime import datetime, timedelta, timezone
+
+########################## Commit Graph
+"""
+In-memory commit graph answering ancestry questions without a Git process per question.
+
+The graph is built on a commit table, e.g. by `load_commit_graph` from a single `git rev-list --all --parents`, and then
+shared by the branch and pull request stages.
+"""
+
+def bitmask_indices(mask):
+    """
+    List the positions of the set bits of a bitmask, e.g. of a label returned by `CommitGraph.containment_labels`.
+
+    :param mask: The bitmask.
+    :type mask: int
+
+    :return: The positions of the set bits in ascending order.
+    :rtype: list
+    """
+    indices = []
+    while mask:
+        lowest = mask & -mask
+        indices.append(lowest.bit_length() - 1)
+        mask ^= lowest
+    return indices
+
+# Uninteresting commits git keeps walking after the last interesting one, see `still_interesting` in git's revision.c
+WALK_SLOP = 5
+
+class CommitGraph:
+    """
+    Ancestry queries on the commits of a `git_console_access.CommitTable`.
+
+    The commits are identified by their rows in the table, which also holds the SHAs, dates and authors, so the history
+    is stored once however many stages use it. Only the parent rows of each commit and a copy of the committer dates
+    are added. Generation numbers (one more than the highest generation of the parents, 1 for root commits) are
+    computed on first use and prune ancestry searches: a commit can only be an ancestor of commits with a higher
+    generation.
+
+    `walk` lists the commits of a revision range in the order of `git log` / `git rev-list` without options, so its
+    results can replace the output of those commands. The table must not grow while the graph is used.
+
+    :param commit_table: The commits, with their committer dates for `walk`. Parents outside the table are ignored.
+    :type commit_table: CommitTable
+    """
+
+    def __init__(self, commit_table):
+        self.table = commit_table
+        # Read once per visited commit, a plain array is faster than numpy scalars
+        self._timestamps = array.array('q', commit_table.committer_timestamps.tobytes())
+        parent_rows = commit_table.parent_indices().tolist()
+        offsets = commit_table.parent_offsets.tolist()
+        self._parents = [
+            tuple(parent for parent in parent_rows[offsets[row]:offsets[row + 1]] if parent >= 0)
+            for row in range(len(commit_table))
+        ]
+        self._generations = None
+        self.ref_tips = []
+
+    def _row(self, sha):
+        try:
+            return self.table.index_of(sha)
+        except (ValueError, TypeError):
+            # Not a full hexadecimal SHA, e.g. None for a missing merge commit
+            return None
+
+    def _sha(self, row):
+        return self.table.sha_of(row)
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, sha):
+        return self._row(sha) is not None
+
+    def parents(self, sha):
+        """
+        Get the parents of a commit.
+
+        :param sha: The SHA of the commit.
+        :type sha: str
+
+        :return: The parent SHAs, first parent first.
+        :rtype: list
+        """
+        return [self._sha(parent) for parent in self._parents[self._row(sha)]]
+
+    def commit_info(self, sha):
+        """
+        Get the author date and author of a commit.
+
+        :param sha: The SHA of the commit.
+        :type sha: str
+
+        :return: A tuple of the author date in strict ISO 8601 format and the author as stored in the table.
+        :rtype: tuple
+        """
+        row = self._row(sha)
+        table = self.table
+        zone = timezone(timedelta(minutes=int(table.tz_offsets[row])))
+        author_date = datetime.fromtimestamp(int(table.timestamps[row]), zone).isoformat()
+        return author_date, table.authors[table.author_codes[row]]
+
+    def _compute_generations(self):
+        generations = array.array('l', [0]) * len(self)
+        for start in range(len(self)):
+            if generations[start]:
+                continue
+            # Iterative post-order, histories are far deeper than the recursion limit
+            stack = [start]
+            while stack:
+                position = stack[-1]
+                pending = [parent for parent in self._parents[position] if not generations[parent]]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                stack.pop()
+                if not generations[position]:
+                    generations[position] = 1 + max((generations[parent] for parent in self._parents[position]), default=0)
+        self._generations = generations
+
+    def generation(self, sha):
+        """
+        Get the generation number of a commit.
+
+        :param sha: The SHA of the commit.
+        :type sha: str
+
+        :return: The length of the longest path from the commit to a root commit, counting both ends.
+        :rtype: int
+        """
+        if self._generations is None:
+            self._compute_generations()
+        return self._generations[self._row(sha)]
+
+    def is_ancestor(self, ancestor, descendant):
+        """
+        Check whether a commit is reachable from another one, like `git merge-base --is-ancestor`.
+
+        :param ancestor: The SHA of the possible ancestor.
+        :type ancestor: str
+        :param descendant: The SHA of the possible descendant.
+        :type descendant: str
+
+        :return: True if `ancestor` is `descendant` or one of its ancestors, False otherwise or if either is unknown.
+        :rtype: bool
+        """
+        target = self._row(ancestor)
+        start = self._row(descendant)
+        if target is None or start is None:
+            return False
+        if target == start:
+            return True
+        if self._generations is None:
+            self._compute_generations()
+        generations = self._generations
+        target_generation = generations[target]
+
+        visited = {start}
+        stack = [start]
+        while stack:
+            for parent in self._parents[stack.pop()]:
+                if parent == target:
+                    return True
+                if generations[parent] > target_generation and parent not in visited:
+                    visited.add(parent)
+                    stack.append(parent)
+        return False
+
+    def containing(self, sha, tips):
+        """
+        Find the tips that contain a commit, like `git branch --contains` does for branch tips.
+
+        :param sha: The SHA of the commit.
+        :type sha: str
+        :param tips: The SHAs of the tips to check.
+        :type tips: list
+
+        :return: The tips in their given order that have the commit as ancestor or are the commit.
+        :rtype: list
+        """
+        return [tip for tip in tips if self.is_ancestor(sha, tip)]
+
+    def containment_labels(self, tips):
+        """
+        Label every commit with the set of tips that contain it, in one pass over the graph.
+
+        The labels are bitsets (Python integers, bit i standing for tips[i]) that only grow as long as the highest tip
+        containing the commit. They are propagated from children to parents in descending generation order, so each
+        parent edge is visited once, whatever the number of tips.
+
+        :param tips: The SHAs of the tips, e.g. of all branches; unknown SHAs contain no commits.
+        :type tips: list
+
+        :return: A dictionary mapping the SHA of each commit contained in at least one tip to its label, see
+                 `bitmask_indices`.
+        :rtype: dict
+        """
+        if self._generations is None:
+            self._compute_generations()
+        generations = self._generations
+
+        labels = [0] * len(self)
+        for bit, tip in enumerate(tips):
+            position = self._row(tip)
+            if position is not None:
+                labels[position] |= 1 << bit
+
+        for position in sorted(range(len(self)), key=generations.__getitem__, reverse=True):
+            label = labels[position]
+            if label:
+                for parent in self._parents[position]:
+                    labels[parent] |= label
+        return {self._sha(position): label for position, label in enumerate(labels) if label}
+
+    def ancestors(self, tips, first_parent=False):
+        """
+        Collect all commits reachable from the given tips, including the tips.
+
+        :param tips: The SHAs to start from; unknown SHAs are ignored.
+        :type tips: list
+        :param first_parent: Whether to follow only the first parent of each commit, defaults to False.
+        :type first_parent: bool, optional
+
+        :return: The SHAs of the reachable commits.
+        :rtype: set
+        """
+        stack = [row for row in map(self._row, tips) if row is not None]
+        visited = set(stack)
+        while stack:
+            parents = self._parents[stack.pop()]
+            for parent in parents[:1] if first_parent else parents:
+                if parent not in visited:
+                    visited.add(parent)
+                    stack.append(parent)
+        return {self._sha(position) for position in visited}
+
+    def first_parent_history(self, tip):
+        """
+        Follow the first parents from a commit to the root commit.
+
+        :param tip: The SHA to start from.
+        :type tip: str
+
+        :return: The SHAs from the tip (first) to the root commit (last), empty if the tip is unknown.
+        :rtype: list
+        """
+        history = []
+        position = self._row(tip)
+        while position is not None:
+            history.append(self._sha(position))
+            parents = self._parents[position]
+            position = parents[0] if parents else None
+        return history
+
+    def walk(self, revisions, first_parent=False):
+        """
+        List the commits of a revision range in the order `git rev-list <revisions>` prints them.
+
+        Revisions are full SHAs, excluded ones prefixed with "^", e.g. `[branch, "^" + main]` for `branch ^main` or
+        `["^" + first_parent, merge]` for `merge^-`. The walk replays the one of git: the commits are taken newest
+        committer date first (ties in the order they were queued), and with excluded revisions it stops a few commits
+        after no commit left to visit can be part of the result.
+
+        :param revisions: The SHAs to include and, prefixed with "^", to exclude; unknown SHAs are ignored.
+        :type revisions: list
+        :param first_parent: Whether to follow only the first parent of included commits, defaults to False. Like in
+                             git, excluded commits still exclude all their ancestors.
+        :type first_parent: bool, optional
+
+        :return: The SHAs of the commits reachable from an included but not from an excluded revision.
+        :rtype: list
+        """
+        timestamps = self._timestamps
+        parents_of = self._parents
+        order = itertools.count()
+        queue = []
+        seen = set()
+        parsed = set()
+        uninteresting = set()
+        # Queued commits that are not excluded (yet)
+        queued_interesting = set()
+
+        def mark_parents_uninteresting(position):
+            # Ancestors are only known for commits git has parsed, i.e. that were queued
+            stack = list(parents_of[position])
+            while stack:
+                parent = stack.pop()
+                if parent in uninteresting:
+                    continue
+                uninteresting.add(parent)
+                queued_interesting.discard(parent)
+                if parent in parsed:
+                    stack.extend(parents_of[parent])
+
+        def enqueue(position):
+            seen.add(position)
+            parsed.add(position)
+            if position not in uninteresting:
+                queued_interesting.add(position)
+            heapq.heappush(queue, (-timestamps[position], next(order), position))
+
+        tips = []
+        for revision in revisions:
+            excluded = revision.startswith("^")
+            position = self._row(revision[1:] if excluded else revision)
+            if position is None:
+                continue
+            parsed.add(position)
+            if excluded and position not in uninteresting:
+                uninteresting.add(position)
+                mark_parents_uninteresting(position)
+            tips.append(position)
+        # The tips are queued once each, sorted by date
+        for position in sorted(dict.fromkeys(tips), key=lambda position: -timestamps[position]):
+            enqueue(position)
+
+        result = []
+        last_date = None
+        slop = WALK_SLOP
+        while queue:
+            _, _, position = heapq.heappop(queue)
+            queued_interesting.discard(position)
+
+            if position in uninteresting:
+                for parent in parents_of[position]:
+                    uninteresting.add(parent)
+                    queued_interesting.discard(parent)
+                    parsed.add(parent)
+                    mark_parents_uninteresting(parent)
+                    if parent not in seen:
+                        enqueue(parent)
+                mark_parents_uninteresting(position)
+                if not queue:
+                    break
+                if (last_date is not None and last_date <= -queue[0][0]) or queued_interesting:
+                    slop = WALK_SLOP
+                else:
+                    slop -= 1
+                    if not slop:
+                        break
+                continue
+
+            for parent in parents_of[position]:
+                parsed.add(parent)
+                if parent not in seen:
+                    enqueue(parent)
+                if first_parent:
+                    break
+            last_date = timestamps[position]
+            result.append(position)
+
+        return [self._sha(position) for position in result if position not in uninteresting]
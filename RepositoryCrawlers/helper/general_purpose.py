@@ -2,6 +2,8 @@ from datetime import datetime
 import logging
 import re
 import hashlib
+import json
+import os
 
 # Configure logging (file or console; adjust as needed)
 logging.basicConfig(
@@ -114,20 +116,8 @@ def transform_time(timestr):
     except ValueError:
         pass
 
-    # Define common datetime formats
-    formats = [
-        '%Y-%m-%dT%H:%M:%S.%f%z',
-        '%Y-%m-%dT%H:%M:%S%z',
-        '%Y-%m-%d %H:%M:%S',
-        '%Y-%m-%d %H:%M:%S.%f',
-        '%d/%m/%Y %H:%M:%S',
-        '%d-%m-%Y %H:%M:%S',
-        '%a, %d %b %Y %H:%M:%S %z',
-        '%a %b %d %H:%M:%S %Y %z'
-    ]
-
-    # Try parsing with each format
-    for fmt in formats:
+    # Try parsing with each common datetime format
+    for fmt in TIME_FORMATS:
         try:
             return datetime.strptime(timestr, fmt)
         except ValueError:
@@ -165,4 +155,320 @@ def substract_and_format_time(start, end):
 def get_user_name_azure(user):
     if 'uniqueName' in user and '@' in user['uniqueName']:
         return user['uniqueName']
-    return user.get('displayName', 'N/A')
\ No newline at end of file
+    return user.get('displayName', 'N/A')
+
+
+def write_csv_in_chunks(rows, store_path, chunk_size=10000):
+    """
+    Write rows to a CSV file in batches while they are produced.
+
+    Every batch of `chunk_size` rows is converted to a DataFrame and appended to the file, so the rows are never held
+    in memory all at once and the first rows reach the disk early. The header is written with the first batch.
+
+    :param rows: An iterable (e.g. a generator) of dictionaries sharing the same keys.
+    :type rows: iterable
+    :param store_path: The path of the CSV file. An existing file is overwritten.
+    :type store_path: str
+    :param chunk_size: The number of rows per batch, defaults to 10000.
+    :type chunk_size: int, optional
+
+    :return: The number of rows written. No file is created if there are none.
+    :rtype: int
+    """
+    written = 0
+    batch = []
+
+    def flush(batch, written):
+        pd.DataFrame(batch).to_csv(store_path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        logging.info(f"Wrote {written + len(batch)} rows to {store_path}")
+        return written + len(batch)
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            written = flush(batch, written)
+            batch = []
+
+    if batch:
+        written = flush(batch, written)
+
+    return written
+
+def write_jsonl(records, store_path, append=False, sync_interval=None):
+    """
+    Write records to a JSON Lines file while they are produced, one compact JSON object per line.
+
+    :param records: An iterable (e.g. a generator) of JSON-serializable dictionaries.
+    :type records: iterable
+    :param store_path: The path of the JSONL file.
+    :type store_path: str
+    :param append: Whether the records are appended to an existing file instead of overwriting it, defaults to False.
+    :type append: bool, optional
+    :param sync_interval: If given, the file is flushed to disk after every this many records, so at most that many
+                          are lost if the process or machine dies. Defaults to None (flushed when done).
+    :type sync_interval: int, optional
+
+    :return: The number of records written.
+    :rtype: int
+    """
+    written = 0
+    with open(store_path, 'a' if append else 'w') as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            written += 1
+            if sync_interval and written % sync_interval == 0:
+                f.flush()
+                os.fsync(f.fileno())
+    logging.info(f"Wrote {written} records to {store_path}")
+    return written
+
+def recover_jsonl(store_path):
+    """
+    Remove an incomplete last line of a JSON Lines file, as left behind by a process that died while writing it.
+
+    :param store_path: The path of the JSONL file.
+    :type store_path: str
+
+    :return: The number of bytes removed.
+    :rtype: int
+    """
+    with open(store_path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        # Search backwards for the line break ending the last complete record
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            chunk = f.read(end - start)
+            index = chunk.rfind(b'\n')
+            if index != -1:
+                end = start + index + 1
+                break
+            end = start
+        f.truncate(end)
+    if end != size:
+        logging.warning(f"Removed an incomplete record of {size - end} bytes from {store_path}")
+    return size - end
+
+def iter_jsonl(store_path):
+    """
+    Lazily read the records of a JSON Lines file.
+
+    :param store_path: The path of the JSONL file.
+    :type store_path: str
+
+    :return: A generator of the records, one per non-empty line.
+    :rtype: generator
+    """
+    with open(store_path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def export_jsonl_as_json(jsonl_path, json_path, indent=4):
+    """
+    Convert a JSON Lines file into a single JSON array, record by record.
+
+    The result is identical to `json.dump(records, f, indent=indent)`, without loading all records at once.
+
+    :param jsonl_path: The path of the JSONL file.
+    :type jsonl_path: str
+    :param json_path: The path of the JSON file. An existing file is overwritten.
+    :type json_path: str
+    :param indent: The indentation of the JSON file, defaults to 4.
+    :type indent: int, optional
+    """
+    prefix = ' ' * indent
+    written = 0
+    with open(json_path, 'w') as f:
+        f.write('[')
+        for record in iter_jsonl(jsonl_path):
+            f.write(',\n' if written else '\n')
+            # Nest the record one level deeper, as json.dump does for list items
+            f.write('\n'.join(prefix + line for line in json.dumps(record, indent=indent).split('\n')))
+            written += 1
+        f.write('\n]' if written else ']')
+
+# Formats tried by `transform_time` and `detect_time_format` after ISO 8601, in this order
+TIME_FORMATS = [
+    '%Y-%m-%dT%H:%M:%S.%f%z',
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%d/%m/%Y %H:%M:%S',
+    '%d-%m-%Y %H:%M:%S',
+    '%a, %d %b %Y %H:%M:%S %z',
+    '%a %b %d %H:%M:%S %Y %z'
+]
+
+# Winning format per source, so detection runs once per source (e.g. "github-issues")
+time_format_cache = {}
+
+def detect_time_format(timestr):
+    """
+    Detect the format of a time string, trying the same formats as `transform_time`.
+
+    :param timestr: A sample time string of a source.
+    :type timestr: str
+
+    :return: The format, 'ISO8601' or a strptime format, or None if no format matches.
+    :rtype: str
+    """
+    try:
+        datetime.fromisoformat(timestr)
+        return 'ISO8601'
+    except ValueError:
+        pass
+
+    for fmt in TIME_FORMATS:
+        try:
+            datetime.strptime(timestr, fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+def transform_time_column(values, source=None):
+    """
+    Transform a whole column of time strings into datetimes at once.
+
+    This is the batched counterpart of `transform_time`: the format is detected once on the first valid value (and
+    cached per `source`), then the column is parsed vectorized. Values with a UTC offset result in a tz-aware column
+    that keeps the offset if all values share it (only mixed offsets are converted to UTC), values without one in a
+    naive column, like the datetimes returned by `transform_time`. Times are truncated to microseconds like Python
+    datetimes. Values that do not match the detected format fall back to `transform_time` individually.
+
+    :param values: The time strings, e.g. a list or Series. None and "n/a" values are allowed.
+    :type values: iterable
+    :param source: A name for the origin of the values (e.g. "github-issues") to cache the detected format under. Defaults to None (no caching).
+    :type source: str, optional
+
+    :return: A datetime64 Series with NaT where no time could be parsed, on the same index as `values` if it is a Series.
+    :rtype: pd.Series
+    """
+    texts = pd.Series(values, dtype=object)
+    is_text = texts.map(lambda value: isinstance(value, str))
+    texts = texts.where(is_text & (texts.str.lower() != "n/a"))
+    # Fix non-standard timezones (e.g., +01:0 → +01:00)
+    texts = texts.str.replace(r'([+-]\d{2}):(\d{1})$', r'\1:0\2', regex=True)
+
+    valid = texts.dropna()
+    if valid.empty:
+        return pd.Series(pd.NaT, index=texts.index, dtype='datetime64[ns]')
+
+    if source is not None and source in time_format_cache:
+        fmt = time_format_cache[source]
+    else:
+        fmt = detect_time_format(valid.iloc[0])
+        if source is not None and fmt is not None:
+            time_format_cache[source] = fmt
+
+    if fmt is None:
+        parsed = pd.Series(pd.NaT, index=texts.index, dtype='datetime64[ns]')
+    else:
+        try:
+            parsed = pd.to_datetime(texts, format=fmt, errors='coerce')
+        except (ValueError, TypeError):
+            # Mixed offsets or mixed naive and aware values can only be represented in UTC
+            parsed = pd.to_datetime(texts, format=fmt, errors='coerce', utc=True)
+        # Python datetimes hold microseconds, e.g. the 7-digit fractions of Azure DevOps are cut like in `transform_time`
+        parsed = parsed.dt.floor('us')
+
+    # Values deviating from the detected format are parsed individually
+    for index in parsed.index[parsed.isna() & texts.notna()]:
+        value = transform_time(texts[index])
+        if isinstance(value, datetime):
+            try:
+                parsed[index] = value
+            except (ValueError, TypeError):
+                logging.error(f'Datetime "{texts[index]}" does not fit the other values of {source}')
+
+    return parsed
+
+def format_time_difference_column(start, end):
+    """
+    Calculate the differences between two datetime columns and format them as strings.
+
+    This is the batched counterpart of `substract_and_format_time`, with the same "DD:HH:MM:SS" format.
+
+    :param start: The start times, e.g. as returned by `transform_time_column`.
+    :type start: pd.Series
+    :param end: The end times, on the same index as `start`.
+    :type end: pd.Series
+
+    :return: An object Series with the formatted differences, or 'n/a' where either time is missing.
+    :rtype: pd.Series
+    """
+    try:
+        time_diff = end - start
+    except TypeError:
+        # Naive and tz-aware columns cannot be subtracted, like in `substract_and_format_time` the result is undefined
+        return pd.Series('n/a', index=start.index, dtype=object)
+
+    missing = time_diff.isna()
+    days = time_diff.dt.days.fillna(0).astype('int64')
+    seconds = time_diff.dt.seconds.fillna(0).astype('int64')
+    hours, remainder = seconds // 3600, seconds % 3600
+    minutes, seconds = remainder // 60, remainder % 60
+
+    formatted = (
+        days.astype(str).str.zfill(2) + ":" +
+        hours.astype(str).str.zfill(2) + ":" +
+        minutes.astype(str).str.zfill(2) + ":" +
+        seconds.astype(str).str.zfill(2)
+    ).astype(object)
+    return formatted.where(~missing, 'n/a')
+
+# Modes of `sample_commits`
+SAMPLING_MODES = ('uniform', 'stratified', 'budget')
+
+def sample_commits(commits, mode, rate=0.1, seed=0):
+    """
+    Select the commits whose file-level data is retrieved, for aggregates over histories too long to process fully.
+
+    - uniform: a simple random sample of `rate` of all commits, each weighted with the inverse of `rate`.
+    - stratified: a random sample of `rate` of the commits of each month (at least one), weighted per month, so
+      sparse periods are not under-represented.
+    - budget: all commits, newest first, each with weight 1. The caller stops when its time budget is used up, so the
+      processed commits cover the most recent part of the history completely.
+
+    The weights are the number of commits each sampled commit stands for, so weighted sums estimate the totals of the
+    whole history.
+
+    :param commits: The commits as read from commits.csv, with at least the columns sha and date.
+    :type commits: pd.DataFrame
+    :param mode: One of `SAMPLING_MODES`.
+    :type mode: str
+    :param rate: The fraction of commits to sample in uniform and stratified mode, defaults to 0.1.
+    :type rate: float, optional
+    :param seed: The seed of the random selection, the same seed selects the same commits. Defaults to 0.
+    :type seed: int, optional
+
+    :return: The selected rows with an additional column sampling_weight, in the order of `commits` (budget: newest first).
+    :rtype: pd.DataFrame
+    """
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"Unknown sampling mode {mode}, expected one of {', '.join(SAMPLING_MODES)}")
+    if commits.empty:
+        return commits.assign(sampling_weight=pd.Series(dtype=float))
+
+    if mode == 'budget':
+        dates = transform_time_column(commits['date'], source='commits')
+        order = dates.sort_values(ascending=False, kind='stable').index
+        return commits.loc[order].assign(sampling_weight=1.0)
+
+    if mode == 'uniform':
+        strata = [commits]
+    else:
+        # Months in UTC, commits without a parseable date form a stratum of their own
+        dates = transform_time_column(commits['date'], source='commits')
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert('UTC')
+        months = dates.dt.strftime('%Y-%m').fillna('n/a')
+        strata = [group for _, group in commits.groupby(months, sort=False)]
+
+    samples = []
+    for stratum in strata:
+        size = max(1, min(len(stratum), round(len(stratum) * rate)))
+        samples.append(stratum.sample(n=size, random_state=seed).assign(sampling_weight=len(stratum) / size))
+    return pd.concat(samples).sort_index()
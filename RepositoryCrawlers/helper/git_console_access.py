@@ -1,10 +1,25 @@
 import subprocess
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import logging
 import concurrent.futures
 import sys
 import re
+import os
+import atexit
+import threading
+import tempfile
+import collections
+import itertools
+import fnmatch
+import array
+import csv
+import contextlib
+import time
+import numpy as np
+import pandas as pd
+from .blob_cache import BlobStatsCache
+from .commit_graph import CommitGraph, bitmask_indices
 
 # Configure logging (file or console; adjust as needed)
 logging.basicConfig(
@@ -12,7 +27,22 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-def run_git_command(args, cwd=None, repo_path=None):
+def decode_git_output(raw):
+    """
+    Decode raw Git output.
+
+    :param raw: The raw bytes as written by Git.
+    :type raw: bytes
+
+    :return: The output decoded as UTF-8 or 'latin-1' if UTF-8 decoding fails.
+    :rtype: str
+    """
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('latin-1')
+
+def run_git_command(args, cwd=None, repo_path=None, input_text=None):
     """
     Run a Git command and return its output.
 
@@ -24,6 +54,8 @@ def run_git_command(args, cwd=None, repo_path=None):
     :type cwd: str, optional
     :param repo_path: The path to the Git repository. If specified, the command will be run with this repository. Defaults to None.
     :type repo_path: str, optional
+    :param input_text: Text passed to the standard input of the command (e.g. for `--stdin`). Defaults to None.
+    :type input_text: str, optional
 
     :return: The output of the Git command, decoded as UTF-8 or 'latin-1' if UTF-8 decoding fails.
     :rtype: str
@@ -39,16 +71,14 @@ def run_git_command(args, cwd=None, repo_path=None):
         result = subprocess.run(
             ["git"] + base_args + args,
             cwd=cwd,  # cwd is still supported for backward compatibility
+            input=input_text.encode('utf-8') if input_text is not None else None,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=False,  # Get raw bytes, not text
             check=True
         )
         # Attempt to decode with UTF-8, fallback to 'latin-1' if needed
-        try:
-            return result.stdout.decode('utf-8').strip()
-        except UnicodeDecodeError:
-            return result.stdout.decode('latin-1').strip()
+        return decode_git_output(result.stdout).strip()
     except subprocess.CalledProcessError as e:
         if 'does not exist in' in str(e.stderr):
             logging.debug(f"Error running command: {' '.join(e.cmd)}")
@@ -58,6 +88,119 @@ def run_git_command(args, cwd=None, repo_path=None):
         logging.error(e.stderr)
         return None
 
+def iter_git_command_lines(args, cwd=None, repo_path=None, input_lines=None):
+    """
+    Run a Git command and yield its output line by line.
+
+    In contrast to `run_git_command`, the output is read incrementally and never held in memory as a whole, so
+    commands with very large outputs (e.g. `git log --all --numstat`) can be parsed in constant memory.
+    Each line is decoded on its own, so a line that is not valid UTF-8 falls back to 'latin-1' without affecting the
+    others. If the consumer stops iterating early, the Git process is terminated.
+
+    :param args: A list of arguments for the Git command.
+    :type args: list
+    :param cwd: The working directory where the command should be run. Defaults to None.
+    :type cwd: str, optional
+    :param repo_path: The path to the Git repository. If specified, the command will be run with this repository. Defaults to None.
+    :type repo_path: str, optional
+    :param input_lines: Lines passed to the standard input of the command (e.g. for `--stdin`). They are written from a
+                        separate thread, so commands answering line by line cannot block. Defaults to None.
+    :type input_lines: iterable, optional
+
+    :return: A generator yielding the output lines without their line breaks. Yields nothing further once an error occurs.
+    :rtype: generator
+    """
+    for raw_line in iter_git_command_records(args, cwd=cwd, repo_path=repo_path, input_lines=input_lines):
+        yield decode_git_output(raw_line.rstrip(b"\r"))
+
+def iter_git_command_records(args, cwd=None, repo_path=None, input_lines=None, separator=b"\n"):
+    """
+    Run a Git command and yield its raw output split at a separator.
+
+    This is the undecoded counterpart of `iter_git_command_lines`, used for commands run with `-z`, whose records are
+    separated by NUL bytes and may contain line breaks.
+
+    :param args: A list of arguments for the Git command.
+    :type args: list
+    :param cwd: The working directory where the command should be run. Defaults to None.
+    :type cwd: str, optional
+    :param repo_path: The path to the Git repository. If specified, the command will be run with this repository. Defaults to None.
+    :type repo_path: str, optional
+    :param input_lines: Lines passed to the standard input of the command, as in `iter_git_command_lines`. Defaults to None.
+    :type input_lines: iterable, optional
+    :param separator: The byte string separating the records. Defaults to a line break.
+    :type separator: bytes, optional
+
+    :return: A generator yielding the records as bytes without the separator. Yields nothing further once an error occurs.
+    :rtype: generator
+    """
+    base_args = []
+    if repo_path:
+        base_args.extend([
+            f"--git-dir={repo_path}/.git",
+            f"--work-tree={repo_path}"
+        ])
+
+    # stderr goes to a temporary file, so a chatty command can never block on a full pipe
+    with tempfile.TemporaryFile() as stderr_file:
+        process = subprocess.Popen(
+            ["git"] + base_args + args,
+            cwd=cwd,
+            stdin=subprocess.PIPE if input_lines is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file
+        )
+        if input_lines is not None:
+            threading.Thread(target=feed_process_input, args=(process, input_lines), daemon=True).start()
+
+        completed = False
+        try:
+            if separator == b"\n":
+                for raw_line in process.stdout:
+                    yield raw_line.rstrip(b"\n")
+            else:
+                remainder = b""
+                for chunk in iter(lambda: process.stdout.read1(1 << 16), b""):
+                    records = (remainder + chunk).split(separator)
+                    remainder = records.pop()
+                    yield from records
+                if remainder:
+                    yield remainder
+            completed = True
+        finally:
+            if not completed and process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            returncode = process.wait()
+
+            if completed and returncode != 0:
+                stderr_file.seek(0)
+                stderr = stderr_file.read()
+                command = ' '.join(process.args)
+                if b'does not exist in' in stderr:
+                    logging.debug(f"Error running command: {command}")
+                    logging.debug(stderr)
+                else:
+                    logging.error(f"Error running command: {command}")
+                    logging.error(stderr)
+
+def feed_process_input(process, input_lines):
+    """
+    Write lines to the standard input of a process and close it afterwards.
+
+    :param process: The running process.
+    :type process: subprocess.Popen
+    :param input_lines: The lines to write, without line breaks.
+    :type input_lines: iterable
+    """
+    try:
+        for line in input_lines:
+            process.stdin.write(line.encode('utf-8') + b"\n")
+        process.stdin.close()
+    except (BrokenPipeError, OSError, ValueError):
+        # The process ended (or was killed) before reading all input
+        pass
+
 def run_console_command(args, path = '.'):
     """
     Run a console command and return its output.
@@ -83,10 +226,7 @@ def run_console_command(args, path = '.'):
             check=True
         )
         # Attempt to decode with UTF-8, fallback to 'latin-1' if needed
-        try:
-            return result.stdout.decode('utf-8').strip()
-        except UnicodeDecodeError:
-            return result.stdout.decode('latin-1').strip()
+        return decode_git_output(result.stdout).strip()
     except subprocess.CalledProcessError as e:
         if "Commit is directly on this branch" in str(e.stderr):
             return str(e.stderr)
@@ -98,6 +238,381 @@ def run_console_command(args, path = '.'):
         logging.error(e.stderr)
         return None
 
+########################## Object Access
+"""
+Functions for reading objects (blobs, trees) from a local Git repository through long-lived `git cat-file` processes
+"""
+
+# Escape sequences used by Git when quoting unusual path names (core.quotePath)
+GIT_PATH_ESCAPES = {'a': 7, 'b': 8, 't': 9, 'n': 10, 'v': 11, 'f': 12, 'r': 13, '"': 34, '\\': 92}
+
+def unquote_git_path(path):
+    """
+    Revert the C-style quoting Git applies to unusual path names.
+
+    Git prints paths with non-ASCII characters or control characters as quoted strings with octal escapes
+    (e.g. `"dir/\\303\\274.txt"`). Object lookups require the real path.
+
+    :param path: The path as printed by Git.
+    :type path: str
+
+    :return: The unquoted path, or the path itself if it is not quoted.
+    :rtype: str
+    """
+    if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+        return path
+
+    inner = path[1:-1]
+    raw = bytearray()
+    index = 0
+    while index < len(inner):
+        char = inner[index]
+        if char == '\\' and index + 1 < len(inner):
+            escaped = inner[index + 1]
+            if escaped in GIT_PATH_ESCAPES:
+                raw.append(GIT_PATH_ESCAPES[escaped])
+                index += 2
+                continue
+            octal = inner[index + 1:index + 4]
+            if len(octal) == 3 and all(c in "01234567" for c in octal):
+                raw.append(int(octal, 8))
+                index += 4
+                continue
+        raw.extend(char.encode('utf-8'))
+        index += 1
+    return decode_git_output(bytes(raw))
+
+class GitObjectReader:
+    """
+    Long-lived reader for the objects of a single Git repository.
+
+    Keeps one `git cat-file --batch` and one `git cat-file --batch-check` process open and serves blob contents,
+    object sizes and tree entries over their pipes, instead of starting a new subprocess for every object.
+    Objects can be requested by any name `git cat-file` understands, including `<commit>:<path>`.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    """
+
+    def __init__(self, repo_path="."):
+        self.repo_path = repo_path
+        self._processes = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _process(self, mode):
+        process = self._processes.get(mode)
+        if process is None or process.poll() is not None:
+            process = subprocess.Popen(
+                ["git", "cat-file", mode],
+                cwd=self.repo_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+            self._processes[mode] = process
+        return process
+
+    def _request(self, mode, name):
+        """
+        Send a single object name to the given cat-file process and parse the header of the answer.
+
+        :return: A tuple of the process and the header dictionary, or the process and None if the object is missing.
+        :rtype: tuple
+        """
+        process = self._process(mode)
+        try:
+            process.stdin.write(name.encode('utf-8') + b"\n")
+            process.stdin.flush()
+            header = process.stdout.readline()
+        except (BrokenPipeError, OSError) as e:
+            logging.error(f"git cat-file {mode} stopped unexpectedly for {self.repo_path}: {e}")
+            self._processes.pop(mode, None)
+            return process, None
+
+        parts = header.rstrip(b"\n").split(b" ")
+        if len(parts) != 3 or not parts[2].isdigit():
+            if not header:
+                logging.error(f"git cat-file {mode} stopped unexpectedly for {self.repo_path}")
+                self._processes.pop(mode, None)
+            return process, None
+
+        return process, {
+            "sha": parts[0].decode('ascii'),
+            "type": parts[1].decode('ascii'),
+            "size": int(parts[2])
+        }
+
+    def object_info(self, name):
+        """
+        Retrieve the SHA, type and size of an object without reading its content.
+
+        :param name: The object name, e.g. a SHA or `<commit>:<path>`.
+        :type name: str
+
+        :return: A dictionary with the keys "sha", "type" and "size", or None if the object does not exist.
+        :rtype: dict or None
+        """
+        if "\n" in name:
+            logging.debug(f"Cannot look up object name containing a line break: {name!r}")
+            return None
+
+        with self._lock:
+            _, info = self._request("--batch-check", name)
+        return info
+
+    def read_object(self, name):
+        """
+        Retrieve the header and raw content of an object.
+
+        :param name: The object name, e.g. a SHA or `<commit>:<path>`.
+        :type name: str
+
+        :return: A tuple of the header dictionary (see `object_info`) and the raw content, or None if the object does not exist.
+        :rtype: tuple or None
+        """
+        if "\n" in name:
+            logging.debug(f"Cannot look up object name containing a line break: {name!r}")
+            return None
+
+        with self._lock:
+            process, info = self._request("--batch", name)
+            if info is None:
+                return None
+            # The content is followed by a single line feed
+            content = process.stdout.read(info["size"] + 1)[:-1]
+        return info, content
+
+    def read_blob(self, commit_hash, file_path):
+        """
+        Retrieve the raw content of a file at a specific commit.
+
+        :param commit_hash: The hash of the commit.
+        :type commit_hash: str
+        :param file_path: The path to the file.
+        :type file_path: str
+
+        :return: The raw content of the file, or None if the path is no file in the commit.
+        :rtype: bytes or None
+        """
+        result = self.read_object(f"{commit_hash}:{file_path}")
+        if result is None or result[0]["type"] != "blob":
+            return None
+        return result[1]
+
+    def tree_entries(self, tree_ish, recursive=False):
+        """
+        Retrieve the entries of a tree, comparable to `git ls-tree`.
+
+        :param tree_ish: A tree or commit SHA, or `<commit>:<directory>`.
+        :type tree_ish: str
+        :param recursive: Whether to descend into subtrees (like `ls-tree -r`), defaults to False.
+        :type recursive: bool, optional
+
+        :return: A list of dictionaries with the keys "mode", "type", "sha" and "path".
+        :rtype: list
+        """
+        result = self.read_object(tree_ish)
+        if result is None:
+            return []
+
+        info, content = result
+        if info["type"] == "commit":
+            # The first line of a commit object references its root tree
+            tree_sha = content.split(b"\n", 1)[0].split(b" ")[1].decode('ascii')
+            return self.tree_entries(tree_sha, recursive=recursive)
+        if info["type"] != "tree":
+            return []
+
+        entries = []
+        position = 0
+        while position < len(content):
+            space = content.index(b" ", position)
+            nul = content.index(b"\0", space)
+            mode = content[position:space].decode('ascii')
+            path = decode_git_output(content[space + 1:nul])
+            sha = content[nul + 1:nul + 21].hex()
+            position = nul + 21
+
+            if mode == "40000":
+                object_type = "tree"
+            elif mode == "160000":
+                object_type = "commit"
+            else:
+                object_type = "blob"
+
+            if recursive and object_type == "tree":
+                for entry in self.tree_entries(sha, recursive=True):
+                    entries.append(entry | {"path": f"{path}/{entry['path']}"})
+            else:
+                entries.append({"mode": mode.zfill(6), "type": object_type, "sha": sha, "path": path})
+        return entries
+
+    def close(self):
+        """
+        Terminate the cat-file processes of this reader.
+        """
+        with self._lock:
+            for process in self._processes.values():
+                try:
+                    process.stdin.close()
+                    process.wait(timeout=5)
+                except (OSError, subprocess.TimeoutExpired):
+                    process.kill()
+            self._processes = {}
+
+# One reader per repository and process, so forked workers never share pipes with their parent
+object_readers = {}
+
+def get_object_reader(repo_path="."):
+    """
+    Get the shared object reader for a repository, starting it if necessary.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+
+    :return: The object reader of the repository for the current process.
+    :rtype: GitObjectReader
+    """
+    key = (os.getpid(), os.path.abspath(repo_path or "."))
+    reader = object_readers.get(key)
+    if reader is None:
+        reader = GitObjectReader(repo_path or ".")
+        object_readers[key] = reader
+    return reader
+
+@atexit.register
+def close_object_readers():
+    """
+    Terminate all object readers started by the current process.
+    """
+    for (pid, _), reader in list(object_readers.items()):
+        if pid == os.getpid():
+            reader.close()
+    object_readers.clear()
+
+########################## Repository Maintenance
+"""
+Functions for checking and writing the auxiliary Git data structures (commit-graph, Bloom filters, multi-pack-index) that speed up history traversals
+"""
+
+# Queries representative for the retrievals in this module, used to measure the effect of optimize_repository
+PROBE_COMMANDS = {
+    "rev-list --all --count": ["rev-list", "--all", "--count"],
+    "log --all": ["log", "--all", "--format=%H"],
+    "log --all -- <path>": ["log", "--all", "--format=%H", "--", "{path}"],
+    "branch --contains HEAD": ["branch", "-a", "--contains", "HEAD"],
+}
+
+def read_commit_graph_chunks(graph_path):
+    """
+    Read the chunk IDs from the table of contents of a commit-graph file.
+
+    :param graph_path: Path to the commit-graph file.
+    :type graph_path: str
+
+    :return: The chunk IDs (e.g. "OIDF", "CDAT", "BDAT"), or an empty set if the file is not a valid commit-graph.
+    :rtype: set
+    """
+    try:
+        with open(graph_path, 'rb') as f:
+            header = f.read(8)
+            if len(header) < 8 or header[:4] != b"CGPH":
+                return set()
+            chunk_count = header[6]
+            # Each entry is a 4 byte ID followed by an 8 byte offset, terminated by an entry with ID 0
+            table = f.read(12 * (chunk_count + 1))
+    except OSError as e:
+        logging.warning(f"Could not read commit-graph {graph_path}: {e}")
+        return set()
+    return {table[i:i + 4].decode('ascii', errors='replace') for i in range(0, 12 * chunk_count, 12)}
+
+def retrieve_repository_features(repo_path="."):
+    """
+    Check which auxiliary data structures are present in a repository.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+
+    :return: A dictionary with the keys commit_graph, changed_paths (Bloom filters in all commit-graph layers), multi_pack_index and pack_count.
+    :rtype: dict
+    """
+    objects_dir = run_git_command(["rev-parse", "--git-path", "objects"], repo_path=repo_path) or ""
+    info_dir = os.path.join(objects_dir, "info")
+    pack_dir = os.path.join(objects_dir, "pack")
+
+    graph_paths = []
+    if os.path.exists(os.path.join(info_dir, "commit-graph")):
+        graph_paths.append(os.path.join(info_dir, "commit-graph"))
+    chain_path = os.path.join(info_dir, "commit-graphs", "commit-graph-chain")
+    if os.path.exists(chain_path):
+        with open(chain_path, 'r') as f:
+            graph_paths.extend(os.path.join(info_dir, "commit-graphs", f"graph-{line.strip()}.graph") for line in f if line.strip())
+
+    graph_chunks = [read_commit_graph_chunks(path) for path in graph_paths]
+    pack_count = len([name for name in os.listdir(pack_dir) if name.endswith(".pack")]) if os.path.isdir(pack_dir) else 0
+
+    return {
+        "commit_graph": any("CDAT" in chunks for chunks in graph_chunks),
+        "changed_paths": bool(graph_chunks) and all("BDAT" in chunks for chunks in graph_chunks),
+        "multi_pack_index": os.path.exists(os.path.join(pack_dir, "multi-pack-index")),
+        "pack_count": pack_count,
+    }
+
+def time_probe_commands(repo_path="."):
+    """
+    Measure the runtime of the probe queries in PROBE_COMMANDS.
+
+    The path-limited probe uses the first entry of the HEAD tree and is skipped if HEAD has no tree.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+
+    :return: A dictionary mapping each probe to its runtime in seconds.
+    :rtype: dict
+    """
+    first_entry = (run_git_command(["ls-tree", "--name-only", "HEAD"], repo_path=repo_path) or "").split("\n")[0]
+
+    timings = {}
+    for name, args in PROBE_COMMANDS.items():
+        if "{path}" in args:
+            if not first_entry:
+                continue
+            args = [first_entry if arg == "{path}" else arg for arg in args]
+        start = time.perf_counter()
+        collections.deque(iter_git_command_lines(args, repo_path=repo_path), maxlen=0)
+        timings[name] = time.perf_counter() - start
+    return timings
+
+def optimize_repository(repo_path="."):
+    """
+    Repack the repository into a single pack and write a multi-pack-index and a commit-graph with changed-path Bloom filters.
+
+    These only add or replace derived data in the object database; refs and the working tree are not touched.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+
+    :return: True if all steps succeeded, False otherwise.
+    :rtype: bool
+    """
+    steps = [
+        # -a merges the existing packs as well, otherwise only loose objects are packed
+        ["repack", "-a", "-d"],
+        ["multi-pack-index", "write"],
+        ["commit-graph", "write", "--reachable", "--changed-paths"],
+    ]
+    for step in steps:
+        logging.info(f"Running git {' '.join(step)}")
+        if run_git_command(step, repo_path=repo_path) is None:
+            return False
+    return True
+
 ########################## Commit Retrievals
 """
 Functions for retrieving commit data from a local Git repository
@@ -255,59 +770,167 @@ def retrieve_commit(commit_hash, repo_path="."):
         "message": commit_info[3]
     }
 
-def retrieve_commit_file_changes(commit_hash, repo_path="."):
+# Arguments of the `diff-tree` calls of `retrieve_commit_file_changes` and `iter_commit_file_changes_bulk`
+DIFF_TREE_ARGS = ["--raw", "--numstat", "--no-abbrev", "-r"]
+
+def build_pathspecs(include_paths="", exclude_paths=""):
+    """
+    Build the pathspecs limiting the file-level Git calls to the paths of interest.
+
+    Patterns are Git pathspecs, e.g. "src" (a directory), "*.pb.go" (at any depth) or ":(glob)**/node_modules".
+    Exclude patterns get the `exclude` magic added, so Git neither diffs nor reads the excluded files.
+
+    :param include_paths: Comma-separated patterns of paths to keep, defaults to "" (all paths).
+    :type include_paths: str, optional
+    :param exclude_paths: Comma-separated patterns of paths to leave out, e.g. "node_modules,third_party". Defaults to "".
+    :type exclude_paths: str, optional
+
+    :return: The pathspecs to pass after "--", empty if all paths are kept.
+    :rtype: list
+    """
+    pathspecs = [pattern.strip() for pattern in include_paths.split(",") if pattern.strip()]
+    for pattern in (pattern.strip() for pattern in exclude_paths.split(",")):
+        if not pattern:
+            continue
+        if pattern.startswith(":("):
+            # Add to the magic words already given
+            pathspecs.append(":(exclude," + pattern[2:])
+        else:
+            pathspecs.append(":(exclude)" + pattern)
+    return pathspecs
+
+def retrieve_commit_file_changes(commit_hash, repo_path=".", batch_word_diff=True, pathspecs=None):
     """
     Retrieve file-specific changes (lines added/deleted) for a given commit, including file SHAs.
 
     This function retrieves the changes made to files in a specific commit, including the number of lines added and deleted, and the file SHAs.
+    For many commits, `iter_commit_file_changes_bulk` avoids starting one `diff-tree` per commit.
 
     :param commit_hash: The hash of the commit.
     :type commit_hash: str
     :param repo_path: Path to the local Git repository, defaults to ".".
     :type repo_path: str, optional
+    :param batch_word_diff: Whether the word-diff stats of all files are calculated with one `git diff` for the whole commit
+                            (`calculate_commit_file_changes`) instead of one per file (`calculate_file_changes`), defaults to True.
+    :type batch_word_diff: bool, optional
+    :param pathspecs: Pathspecs limiting the files, see `build_pathspecs`. Defaults to None (all files).
+    :type pathspecs: list, optional
 
     :return: A list of dictionaries containing file changes.
     :rtype: list
     """
-    # Step 1: Use `git diff-tree` to get file changes for a commit
-    git_diff_args = ["diff-tree", "--no-commit-id", "--numstat", "-r", commit_hash]
+    # Use `git diff-tree` to get file changes for a commit, --raw adds the blob SHAs before and after
+    git_diff_args = ["diff-tree", "--no-commit-id"] + DIFF_TREE_ARGS + [commit_hash, "--"] + (pathspecs or [])
     diff_output = run_git_command(git_diff_args, cwd=repo_path)
+    diff_lines = diff_output.splitlines() if diff_output else []
+
+    return parse_diff_tree_lines(commit_hash, diff_lines, repo_path=repo_path, batch_word_diff=batch_word_diff, pathspecs=pathspecs)
 
-    # Step 2: Use `git ls-tree` to get the SHA for all files in the commit
-    git_ls_tree_args = ["ls-tree", "-r", commit_hash]
-    ls_tree_output = run_git_command(git_ls_tree_args, cwd=repo_path)
-
-    # Create a dictionary of file paths to SHAs from the ls-tree output
-    file_sha_map = {}
-    if ls_tree_output:
-        for line in ls_tree_output.splitlines():
-            parts = line.split()
-            if len(parts) >= 4:
-                file_sha = parts[2]  # The third part is the SHA
-                file_path = parts[3]  # The fourth part is the file path
-                file_sha_map[file_path] = file_sha
-
-    # Step 3: Parse the diff-tree output to gather changes with SHAs
+def iter_commit_file_changes_bulk(commit_hashes, repo_path=".", batch_word_diff=True, pathspecs=None):
+    """
+    Retrieve the file changes of many commits (see `retrieve_commit_file_changes`) with a single `diff-tree --stdin`.
+
+    All hashes are fed to one Git process, which prints a line with the hash of each commit followed by its raw and
+    numstat lines. Commits without such output (root and merge commits, empty commits) get an empty list, so every
+    given commit is yielded once and in the given order. The word-diff stats are still calculated per commit.
+    Commits changing only files outside of `pathspecs` have no output either.
+
+    :param commit_hashes: The full hashes of the commits.
+    :type commit_hashes: iterable
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param batch_word_diff: As in `retrieve_commit_file_changes`, defaults to True.
+    :type batch_word_diff: bool, optional
+    :param pathspecs: Pathspecs limiting the files, see `build_pathspecs`. Defaults to None (all files).
+    :type pathspecs: list, optional
+
+    :return: A generator of (commit hash, file changes) tuples, the file changes as returned by `retrieve_commit_file_changes`.
+    :rtype: generator
+    """
+    commit_hashes = list(commit_hashes)
+    remaining = iter(commit_hashes)
+    current_hash = None
+    diff_lines = []
+
+    for line in iter_git_command_lines(["diff-tree", "--stdin"] + DIFF_TREE_ARGS + ["--"] + (pathspecs or []), cwd=repo_path, input_lines=commit_hashes):
+        # Raw lines start with ":" and numstat lines contain a tab, the remaining lines start a new commit
+        if line.startswith(":") or "\t" in line:
+            diff_lines.append(line)
+            continue
+
+        if current_hash is not None:
+            yield current_hash, parse_diff_tree_lines(current_hash, diff_lines, repo_path=repo_path, batch_word_diff=batch_word_diff, pathspecs=pathspecs)
+        current_hash = line.strip()
+        diff_lines = []
+
+        # The commits in between had no output
+        for commit_hash in remaining:
+            if commit_hash == current_hash:
+                break
+            yield commit_hash, []
+
+    if current_hash is not None:
+        yield current_hash, parse_diff_tree_lines(current_hash, diff_lines, repo_path=repo_path, batch_word_diff=batch_word_diff, pathspecs=pathspecs)
+    for commit_hash in remaining:
+        yield commit_hash, []
+
+def parse_diff_tree_lines(commit_hash, diff_lines, repo_path=".", batch_word_diff=True, pathspecs=None):
+    """
+    Parse the raw and numstat lines `diff-tree` prints for one commit into file changes.
+
+    :param commit_hash: The hash of the commit, needed for the word-diff stats.
+    :type commit_hash: str
+    :param diff_lines: The output lines of the commit, without the line with its hash.
+    :type diff_lines: list
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param batch_word_diff: As in `retrieve_commit_file_changes`, defaults to True.
+    :type batch_word_diff: bool, optional
+    :param pathspecs: The pathspecs `diff-tree` was limited to, the word-diff is limited to them as well. Defaults to None.
+    :type pathspecs: list, optional
+
+    :return: A list of dictionaries containing file changes, see `retrieve_commit_file_changes`.
+    :rtype: list
+    """
+    # Step 1: Collect the SHAs from the raw lines (":<old mode> <new mode> <old sha> <new sha> <status>\t<path>"),
+    # they come in the same order as the numstat lines
+    raw_shas = [line[1:].split("\t", 1)[0].split(" ")[2:4] for line in diff_lines if line.startswith(":")]
+    numstat_lines = [line for line in diff_lines if not line.startswith(":")]
+
+    # Step 2: Calculate the word-diff stats of all changed files at once
+    word_diff_stats = {}
+    if numstat_lines and batch_word_diff:
+        file_paths = {unquote_git_path(line.split("\t")[-1]) for line in numstat_lines}
+        word_diff_stats = calculate_commit_file_changes(commit_hash, repo_path=repo_path, file_paths=file_paths, pathspecs=pathspecs)
+
+    # Step 3: Parse the numstat lines to gather changes with SHAs
     file_changes = []
-    if diff_output:
-        for line in diff_output.splitlines():
+    if numstat_lines:
+        for index, line in enumerate(numstat_lines):
             parts = line.split("\t")
             if len(parts) == 3:
                 added = int(parts[0]) if parts[0] != "-" else 0
                 deleted = int(parts[1]) if parts[1] != "-" else 0
                 file_path = parts[2]
 
-                # Get the file SHA from the map created from ls-tree
-                file_sha = file_sha_map.get(file_path)
+                # Deleted files do not exist in the commit anymore, added files did not exist before
+                old_sha, new_sha = raw_shas[index] if index < len(raw_shas) else (NULL_SHA, NULL_SHA)
+                file_sha = new_sha if new_sha != NULL_SHA else None
+                old_file_sha = old_sha if old_sha != NULL_SHA else None
                 
-                # Calculate changed lines for this file using the new function
-                file_changes_stats = calculate_file_changes(commit_hash, file_path, repo_path=repo_path)
+                # Calculate changed lines for this file
+                if batch_word_diff:
+                    file_changes_stats = word_diff_stats.get(unquote_git_path(file_path), dict(EMPTY_WORD_DIFF_STATS))
+                else:
+                    file_changes_stats = calculate_file_changes(commit_hash, file_path, repo_path=repo_path)
                 
                 result = {
                     "file_path": file_path,
                     "loc_added": added,
                     "loc_removed": deleted,
-                    "file_sha": file_sha
+                    "file_sha": file_sha,
+                    "old_file_sha": old_file_sha,
+                    "is_binary": parts[0] == "-"
                 } | file_changes_stats
 
                 file_changes.append(result)
@@ -329,7 +952,7 @@ def retrieve_commits_with_stats(
             to determine the total number of commits that match the given criteria.
         2. Invokes 'git log --numstat' with a custom pretty format to collect commit metadata,
             parent SHAs, and file-level added/deleted line counts, all in a single traversal.
-        3. Parses the output line by line, aggregating additions and deletions per commit,
+        3. Parses the NUL-delimited output while it is streamed, aggregating additions and deletions per commit,
             and logging progress at regular intervals (e.g., every 1,000 commits).
 
     :param parameters: Dictionary of optional parameters to filter commits (e.g., {"since": "2023-01-01", "until": "2023-12-31"}).
@@ -391,9 +1014,10 @@ def retrieve_commits_with_stats(
     # 2) Build the git log --numstat command in a single pass
     log_args = [
         "log",
+        "-z",
         "--numstat",
         "--date=iso",
-        "--pretty=format:COMMIT|%H|%an|%ad|%s|%P"
+        "--format=%x00COMMIT%x00%H%x00%an%x00%ad%x00%s%x00%P"
     ]
 
     # Add optional filters
@@ -406,72 +1030,34 @@ def retrieve_commits_with_stats(
     log_args.append("--all")
     log_args.append("--")
 
-    output = run_git_command(log_args, cwd=repo_path)
-    lines = output.splitlines()
-
-    # 3) Parse the output
+    # 3) Parse the output while it is streamed
     detailed_commits = []
-    current_commit = None
     processed = 0
 
-    for line in lines:
-        if line.startswith("COMMIT|"):
-            # Store the previous commit
-            if current_commit:
-                detailed_commits.append(current_commit)
-
-            parts = line.split("|", 6)
-            if len(parts) < 6:
-                continue
-
-            sha = parts[1]
-            author = parts[2]
-            date_str = parts[3]
-            message = parts[4]
-            parent_shas = parts[5].split() if parts[5] else []
+    for commit, _ in parse_commit_log_records(iter_git_log_records(log_args, cwd=repo_path)):
+        detailed_commits.append(commit)
 
-            current_commit = {
-                "sha": sha,
-                "author": author,
-                "date": datetime.fromisoformat(date_str),
-                "message": message,
-                "parents": parent_shas,
-                "loc_added": 0,
-                "loc_deleted": 0,
-            }
-
-            processed += 1
-            if processed % progress_interval == 0:
-                logging.info(f"Processed {processed} of {total_commits} commits...")
-
-        else:
-            # Expecting numstat lines: <added>\t<deleted>\t<filename>
-            parts = line.split("\t")
-            if len(parts) == 3:
-                added_str, deleted_str, _filename = parts
-                added = int(added_str) if added_str.isdigit() else 0
-                deleted = int(deleted_str) if deleted_str.isdigit() else 0
-                if current_commit:
-                    current_commit["loc_added"] += added
-                    current_commit["loc_deleted"] += deleted
-
-    # Add the last commit
-    if current_commit:
-        detailed_commits.append(current_commit)
+        processed += 1
+        if processed % progress_interval == 0:
+            logging.info(f"Processed {processed} of {total_commits} commits...")
 
     logging.info(f"Finished processing {processed} commits out of {total_commits} expected.")
 
     return detailed_commits
 
-def retrieve_all_commits_with_stats_and_logging(repo_path="."):
+def retrieve_all_commits_with_stats_and_logging(repo_path=".", workers=1):
     """
     Retrieve all commits (including parents, stats) in a single pass,
     and log progress at regular intervals.
 
     This function retrieves all commits from a Git repository, including parent SHAs and line-level stats, and logs progress at regular intervals.
+    It collects the results of `iter_all_commits_with_stats`; use the iterator directly to keep memory bounded on large repositories.
 
     :param repo_path: Path to the local Git repository, defaults to ".".
     :type repo_path: str, optional
+    :param workers: Number of concurrent Git processes, defaults to 1. With more than one worker the history is
+                    traversed in shards by `iter_all_commits_with_stats_parallel`.
+    :type workers: int, optional
 
     :return: A list of commit dictionaries, where each dictionary contains:
                 {
@@ -485,104 +1071,714 @@ def retrieve_all_commits_with_stats_and_logging(repo_path="."):
                 }
     :rtype: list
     """
+    if workers > 1:
+        return list(iter_all_commits_with_stats_parallel(repo_path, workers=workers))
+    return list(iter_all_commits_with_stats(repo_path))
+
+def iter_all_commits_with_stats(repo_path=".", revisions=None):
+    """
+    Iterate over all commits (including parents, stats) in a single pass,
+    and log progress at regular intervals.
+
+    This function yields each commit as soon as its numstat lines are parsed, so only one commit is held in memory at a time.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param revisions: Revisions to traverse instead of all refs, e.g. `["<new tip>", "^<old tip>"]`.
+                      They are passed via `--stdin`, so long lists do not exceed the command line limit. Defaults to None (`--all`).
+    :type revisions: list, optional
+
+    :return: A generator of commit dictionaries as described in `retrieve_all_commits_with_stats_and_logging`.
+    :rtype: generator
+    """
+    revision_args = ["--all"] if revisions is None else ["--stdin"]
+    revision_input = None if revisions is None else "\n".join(revisions) + "\n"
+
     # 1) Get total commit count so you know how many commits there are in total
-    count_cmd = ["rev-list", "--all", "--count"]
-    total_count_output = run_git_command(count_cmd, cwd=repo_path)
+    count_cmd = ["rev-list", "--count"] + revision_args
+    total_count_output = run_git_command(count_cmd, cwd=repo_path, input_text=revision_input)
     try:
         total_commits = int(total_count_output.strip())
-    except ValueError:
+    except (ValueError, AttributeError):
         total_commits = 0
 
     if total_commits == 0:
         logging.debug("No commits found in repository.")
-        return []
+        return
 
     logging.info(f"Total commits: {total_commits}")
 
     # 2) Prepare a single git command to get all data in one pass
-    #    Using a special delimiter (e.g., 'COMMIT|') for easy parsing.
-    #    %P for parents; %an for author; %ad for date; %s for subject.
-    git_cmd = [
-        "log",
-        "--all",
-        "--numstat",
-        "--date=iso-strict",
-        "--pretty=format:COMMIT|%H|%ae|%ad|%s|%P"
-    ]
-    output = run_git_command(git_cmd, cwd=repo_path)
+    git_cmd = ["log"] + COMMIT_LOG_ARGS + revision_args
+    processed = 0  # How many commits processed so far
 
-    detailed_commits = []
+    # 3) Parse the output while it is streamed
+    for commit, _ in parse_commit_log_records(iter_git_log_records(git_cmd, cwd=repo_path, input_lines=revisions)):
+        yield commit
+
+        processed += 1
+        # Log every 1,000 commits (adjust this interval as needed)
+        if processed % 1000 == 0:
+            logging.info(f"Processed {processed} of {total_commits} commits...")
+
+    logging.info(f"Finished processing {processed} commits in total.")
+
+    # Optional: Cross-check final count
+    if processed != total_commits:
+        logging.debug(f"Expected {total_commits} commits but only parsed {processed}")
+
+# Fields are separated by NUL bytes, which cannot occur in commit metadata, so subjects may contain any character.
+# %P for parents; %ae for author; %ad for date; %s for subject.
+COMMIT_LOG_FORMAT = "--format=%x00COMMIT%x00%H%x00%ae%x00%ad%x00%s%x00%P"
+COMMIT_LOG_ARGS = [
+    "-z",
+    "--numstat",
+    "--date=iso-strict",
+    COMMIT_LOG_FORMAT
+]
+
+# Variant of COMMIT_LOG_ARGS that also lists the changed files of each commit.
+# --raw adds modes, blob SHAs and status; with -z paths are never quoted.
+COMMIT_FILE_LOG_ARGS = COMMIT_LOG_ARGS + [
+    "--raw",
+    "--no-abbrev",
+    "-M"
+]
+
+# Blob SHA of a file that does not exist on one side of a diff
+NULL_SHA = "0" * 40
+
+def iter_git_log_records(args, cwd=None, repo_path=None, input_lines=None):
+    """
+    Run a `git log` command with one of the NUL-delimited formats above and yield its raw records.
+
+    :return: A generator of the records as bytes, see `iter_git_command_records`.
+    :rtype: generator
+    """
+    return iter_git_command_records(args, cwd=cwd, repo_path=repo_path, input_lines=input_lines, separator=b"\0")
+
+def parse_commit_log_records(records):
+    """
+    Parse the NUL-separated output of `git log` run with `COMMIT_LOG_ARGS` or `COMMIT_FILE_LOG_ARGS`.
+
+    The output of each commit consists of the marker "COMMIT" and the five format fields, followed by
+    - with `--raw`: one entry per changed file (":<old mode> <new mode> <old sha> <new sha> <status>" followed by one
+      path, or two for renames and copies),
+    - one numstat entry per changed file ("<added>\t<deleted>\t<path>", or "<added>\t<deleted>\t" followed by two paths).
+    Raw and numstat entries come in the same order, so they are matched by position. Merge commits have no entries.
+
+    The records are parsed as bytes, and only the values that end up in the result are decoded. Paths are therefore
+    only decoded when `--raw` is given.
+
+    :param records: The NUL-separated records of the log output as bytes.
+    :type records: iterable
+
+    :return: A generator of (commit, file changes) tuples. The commit is a dictionary as described in
+             `retrieve_all_commits_with_stats_and_logging`, each file change a dictionary with the keys file_path,
+             old_file_path, status, loc_added, loc_removed, file_sha, old_file_sha, file_mode and is_binary. Without
+             `--raw`, the file changes are empty.
+    :rtype: generator
+    """
+    records = iter(records)
     current_commit = None
-    processed = 0  # How many commits processed so far
+    file_changes = []
+    numstat_index = 0
 
-    # 3) Parse the output line by line
-    for line in output.splitlines():
-        if line.startswith("COMMIT|"):
-            # Save the previous commit (if any) before starting a new one
+    for record in records:
+        if record == b"COMMIT":
+            # Hand out the previous commit (if any) before starting a new one
             if current_commit:
-                detailed_commits.append(current_commit)
-
-            # Parse commit metadata: COMMIT|<sha>|<author>|<date>|<message>|<parents...>
-            parts = line.split("|")
-            # Make sure we have at least 6 parts:
-            #   0: "COMMIT"
-            #   1: sha
-            #   2: author
-            #   3: date
-            #   4: message
-            #   5: parents
-            if len(parts) < 6:
+                yield current_commit, file_changes
+
+            fields = list(itertools.islice(records, 5))
+            if len(fields) < 5:
+                current_commit = None
+                break
+            sha, author, date_str, message, parents = fields
+
+            current_commit = {
+                "sha": sha.decode('ascii'),
+                "author": decode_git_output(author),
+                "date": datetime.fromisoformat(date_str.decode('ascii')),
+                "message": decode_git_output(message),
+                "parents": parents.decode('ascii').split(),
+                "loc_added": 0,
+                "loc_deleted": 0,
+            }
+            file_changes = []
+            numstat_index = 0
+
+        elif b"\t" in record:
+            # Numstat entry, renames and copies have an empty path followed by the old and new path
+            added_str, deleted_str, path = record.split(b"\t", 2)
+            if not path:
+                next(records, None)
+                next(records, None)
+            if current_commit is None:
                 continue
 
-            sha = parts[1]
-            author = parts[2]
-            date_str = parts[3]
-            message = parts[4]
-            parent_shas = parts[5].split() if parts[5] else []
-            
-            # Explicit check here:
-            if len(sha) != 40 or not all(c in "0123456789abcdef" for c in sha.lower()):
-                logging.warning(f"Invalid commit SHA detected: '{sha}' in line: {line}")
+            # Binary files are marked with "-", the first entry after the format fields starts with a line break
+            added_str = added_str.lstrip(b"\n")
+            added = int(added_str) if added_str.isdigit() else 0
+            deleted = int(deleted_str) if deleted_str.isdigit() else 0
+            current_commit["loc_added"] += added
+            current_commit["loc_deleted"] += deleted
+            if numstat_index < len(file_changes):
+                file_changes[numstat_index]["loc_added"] = added
+                file_changes[numstat_index]["loc_removed"] = deleted
+                file_changes[numstat_index]["is_binary"] = added_str == b"-"
+            numstat_index += 1
+
+        elif record[:1] == b":" or record[:2] == b"\n:":
+            # Raw entry: :<old mode> <new mode> <old sha> <new sha> <status><score>
+            old_mode, new_mode, old_sha, new_sha, status = record.lstrip(b"\n")[1:].decode('ascii').split(" ")
+            is_copy_or_rename = status[0] in "RC"
+            old_path = decode_git_output(next(records, b""))
+            new_path = decode_git_output(next(records, b"")) if is_copy_or_rename else old_path
+            if current_commit is None:
                 continue
 
-            current_commit = {
-                "sha": sha,
+            file_changes.append({
+                "file_path": new_path,
+                "old_file_path": old_path if is_copy_or_rename else None,
+                "status": status[0],
+                "loc_added": 0,
+                "loc_removed": 0,
+                "file_sha": new_sha if new_sha != NULL_SHA else None,
+                "old_file_sha": old_sha if old_sha != NULL_SHA else None,
+                "file_mode": new_mode,
+                "is_binary": False,
+            })
+
+    # Hand out the last commit processed
+    if current_commit:
+        yield current_commit, file_changes
+
+def iter_all_commits_with_files(repo_path=".", revisions=None):
+    """
+    Iterate over all commits together with their changed files in a single `git log` traversal.
+
+    This replaces running `iter_all_commits_with_stats` followed by one `diff-tree` per commit.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param revisions: Revisions to traverse instead of all refs, as in `iter_all_commits_with_stats`. Defaults to None (`--all`).
+    :type revisions: list, optional
+
+    :return: A generator of (commit, file changes) tuples as described in `parse_commit_log_records`.
+    :rtype: generator
+    """
+    revision_args = ["--all"] if revisions is None else ["--stdin"]
+    revision_input = None if revisions is None else "\n".join(revisions) + "\n"
+
+    total_count_output = run_git_command(["rev-list", "--count"] + revision_args, cwd=repo_path, input_text=revision_input)
+    try:
+        total_commits = int(total_count_output.strip())
+    except (ValueError, AttributeError):
+        total_commits = 0
+
+    if total_commits == 0:
+        logging.debug("No commits found in repository.")
+        return
+
+    logging.info(f"Total commits: {total_commits}")
+
+    git_cmd = ["log"] + COMMIT_FILE_LOG_ARGS + revision_args
+    processed = 0
+
+    for commit, file_changes in parse_commit_log_records(iter_git_log_records(git_cmd, cwd=repo_path, input_lines=revisions)):
+        yield commit, file_changes
+
+        processed += 1
+        if processed % 1000 == 0:
+            logging.info(f"Processed {processed} of {total_commits} commits...")
+
+    logging.info(f"Finished processing {processed} commits in total.")
+
+def retrieve_commit_shard(shas, repo_path="."):
+    """
+    Retrieve the commits (including parents, stats) of one shard of the history.
+
+    The commits are shown with `git log --no-walk=unsorted`, so they keep the order of the given SHAs.
+
+    :param shas: The SHAs of the commits in the shard.
+    :type shas: list
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+
+    :return: A list of commit dictionaries as described in `retrieve_all_commits_with_stats_and_logging`.
+    :rtype: list
+    """
+    git_cmd = ["log", "--no-walk=unsorted", "--stdin"] + COMMIT_LOG_ARGS
+    return [commit for commit, _ in parse_commit_log_records(iter_git_log_records(git_cmd, cwd=repo_path, input_lines=shas))]
+
+def iter_all_commits_with_stats_parallel(repo_path=".", revisions=None, workers=4, shard_size=None):
+    """
+    Iterate over all commits (including parents, stats) using several `git log` processes at once.
+
+    A single `git log --numstat` is bounded by one core, as it computes every diff itself. This function lists the
+    commits in log order with `git rev-list` (cheap, no diffs), splits the list into disjoint shards of consecutive
+    commits and runs one `git log` per shard in a thread pool. The pool only dispatches and parses, the diffs are
+    computed by the Git processes on separate cores. Shards are yielded in their original order and only a few shards
+    are in flight at a time, so the output equals `iter_all_commits_with_stats` and memory stays bounded.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param revisions: Revisions to traverse instead of all refs, see `iter_all_commits_with_stats`. Defaults to None (`--all`).
+    :type revisions: list, optional
+    :param workers: Number of concurrent Git processes, defaults to 4.
+    :type workers: int, optional
+    :param shard_size: Number of commits per shard. Defaults to None, which spreads the history over four shards per
+                       worker with at most 10,000 commits each.
+    :type shard_size: int, optional
+
+    :return: A generator of commit dictionaries as described in `retrieve_all_commits_with_stats_and_logging`.
+    :rtype: generator
+    """
+    revision_args = ["--all"] if revisions is None else ["--stdin"]
+    shas = list(iter_git_command_lines(["rev-list"] + revision_args, cwd=repo_path, input_lines=revisions))
+    total_commits = len(shas)
+
+    if total_commits == 0:
+        logging.debug("No commits found in repository.")
+        return
+
+    if shard_size is None:
+        shard_size = min(max(1, -(-total_commits // (workers * 4))), 10000)
+    shards = [shas[index:index + shard_size] for index in range(0, total_commits, shard_size)]
+    logging.info(f"Total commits: {total_commits}, processed in {len(shards)} shards by {workers} workers")
+
+    processed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded window of shards in flight and consume them in order
+        pending = collections.deque()
+        shard_iterator = iter(shards)
+        for shard in itertools.islice(shard_iterator, workers * 2):
+            pending.append(executor.submit(retrieve_commit_shard, shard, repo_path))
+
+        while pending:
+            commits = pending.popleft().result()
+            next_shard = next(shard_iterator, None)
+            if next_shard is not None:
+                pending.append(executor.submit(retrieve_commit_shard, next_shard, repo_path))
+
+            yield from commits
+
+            processed += len(commits)
+            logging.info(f"Processed {processed} of {total_commits} commits...")
+
+    logging.info(f"Finished processing {processed} commits in total.")
+    if processed != total_commits:
+        logging.debug(f"Expected {total_commits} commits but only parsed {processed}")
+
+class CommitTable:
+    """
+    Compact, columnar in-memory table of commits.
+
+    A commit dictionary with a `datetime`, a parents list and hexadecimal SHA strings costs roughly 1 KB. This table
+    stores the same data column by column: SHAs as fixed 20-byte binary values, authors interned as integer codes,
+    dates as int64 epoch seconds plus the UTC offset in minutes, and parents in one flat binary array indexed by
+    per-commit offsets. Histories with millions of commits can thus be loaded once and shared by several stages;
+    `commit_graph.CommitGraph` answers ancestry questions on top of a table.
+
+    Columns are exposed as numpy views on the underlying buffers without copying. SHAs use the raw `V20` dtype, as
+    `S20` would drop trailing NUL bytes. Commits must be appended before any view is taken, as a buffer with live
+    views cannot grow.
+    """
+
+    def __init__(self):
+        self._shas = bytearray()
+        self._timestamps = array.array('q')
+        self._committer_timestamps = array.array('q')
+        self._tz_offsets = array.array('h')
+        self._author_codes = array.array('i')
+        self._parent_offsets = array.array('q', [0])
+        self._parents = bytearray()
+        self._loc_added = array.array('q')
+        self._loc_deleted = array.array('q')
+        self.authors = []
+        self.messages = []
+        self._author_lookup = {}
+        self._sorted_order = None
+        self._sorted_shas = None
+
+    @classmethod
+    def from_commits(cls, commits):
+        """
+        Build a table from commit dictionaries, e.g. the generator returned by `iter_all_commits_with_stats`.
+
+        :param commits: An iterable of commit dictionaries as described in `retrieve_all_commits_with_stats_and_logging`.
+        :type commits: iterable
+
+        :return: The filled table.
+        :rtype: CommitTable
+        """
+        table = cls()
+        for commit in commits:
+            table.append(commit)
+        return table
+
+    def append(self, commit):
+        """
+        Append a single commit dictionary to the table.
+
+        :param commit: A commit dictionary as described in `retrieve_all_commits_with_stats_and_logging`. It may also
+                       contain the committer date as committer_timestamp (epoch seconds), which defaults to the date.
+        :type commit: dict
+        """
+        self._shas += bytes.fromhex(commit["sha"])
+
+        date = commit["date"]
+        offset = date.utcoffset()
+        self._timestamps.append(int(date.timestamp()))
+        self._committer_timestamps.append(commit.get("committer_timestamp", self._timestamps[-1]))
+        self._tz_offsets.append(int(offset.total_seconds() // 60) if offset is not None else 0)
+
+        author = commit["author"]
+        code = self._author_lookup.get(author)
+        if code is None:
+            code = len(self.authors)
+            self._author_lookup[author] = code
+            self.authors.append(author)
+        self._author_codes.append(code)
+
+        for parent in commit["parents"]:
+            if len(parent) != 40:
+                logging.warning(f"Skipping invalid parent SHA '{parent}' of commit {commit['sha']}")
+                continue
+            self._parents += bytes.fromhex(parent)
+        self._parent_offsets.append(len(self._parents) // 20)
+
+        self._loc_added.append(commit["loc_added"])
+        self._loc_deleted.append(commit["loc_deleted"])
+        self.messages.append(commit["message"])
+        self._sorted_order = None
+        self._sorted_shas = None
+
+    def __len__(self):
+        return len(self._timestamps)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.commit(index)
+
+    @property
+    def shas(self):
+        """The commit SHAs as a numpy array of raw 20-byte values (no copy), `bytes(sha).hex()` gives the hexadecimal SHA."""
+        return np.frombuffer(self._shas, dtype='V20')
+
+    @property
+    def timestamps(self):
+        """The commit dates as int64 seconds since the epoch (no copy)."""
+        return np.frombuffer(self._timestamps, dtype=np.int64)
+
+    @property
+    def committer_timestamps(self):
+        """The committer dates as int64 seconds since the epoch, the dates if none were given (no copy)."""
+        return np.frombuffer(self._committer_timestamps, dtype=np.int64)
+
+    @property
+    def tz_offsets(self):
+        """The UTC offsets of the commit dates in minutes (no copy)."""
+        return np.frombuffer(self._tz_offsets, dtype=np.int16)
+
+    @property
+    def author_codes(self):
+        """The index of each commit's author in `authors` (no copy)."""
+        return np.frombuffer(self._author_codes, dtype=np.int32)
+
+    @property
+    def parent_offsets(self):
+        """Start of each commit's parents in `parents`; the parents of commit i are parents[offsets[i]:offsets[i + 1]] (no copy)."""
+        return np.frombuffer(self._parent_offsets, dtype=np.int64)
+
+    @property
+    def parents(self):
+        """The parent SHAs of all commits as one numpy array of raw 20-byte values (no copy)."""
+        return np.frombuffer(self._parents, dtype='V20')
+
+    @property
+    def loc_added(self):
+        """The added lines per commit (no copy)."""
+        return np.frombuffer(self._loc_added, dtype=np.int64)
+
+    @property
+    def loc_deleted(self):
+        """The deleted lines per commit (no copy)."""
+        return np.frombuffer(self._loc_deleted, dtype=np.int64)
+
+    def index_of(self, sha):
+        """
+        Find the row of a commit.
+
+        :param sha: The full hexadecimal SHA of the commit.
+        :type sha: str
+
+        :return: The row index, or None if the commit is not part of the table.
+        :rtype: int or None
+        """
+        self._sort_shas()
+        key = np.frombuffer(bytes.fromhex(sha), dtype='V20')[0]
+        sorted_shas = self._sorted_shas
+        position = int(np.searchsorted(sorted_shas, key))
+        if position < len(sorted_shas) and sorted_shas[position] == key:
+            return int(self._sorted_order[position])
+        return None
+
+    def _sort_shas(self):
+        if self._sorted_order is None:
+            self._sorted_order = np.argsort(self.shas, kind='stable')
+            self._sorted_shas = self.shas[self._sorted_order]
+
+    def parent_indices(self):
+        """
+        Find the rows of all parents at once.
+
+        :return: The row of each entry of `parents`, or -1 for parents that are not part of the table.
+        :rtype: np.ndarray
+        """
+        self._sort_shas()
+        if len(self) == 0:
+            return np.full(len(self.parents), -1, dtype=np.int64)
+        parents = self.parents
+        positions = np.minimum(np.searchsorted(self._sorted_shas, parents), len(self) - 1)
+        found = self._sorted_shas[positions] == parents
+        return np.where(found, self._sorted_order[positions], -1)
+
+    def sha_of(self, index):
+        """
+        Get the SHA of the commit in the given row.
+
+        :param index: The row index.
+        :type index: int
+
+        :return: The full hexadecimal SHA.
+        :rtype: str
+        """
+        return self._shas[index * 20:(index + 1) * 20].hex()
+
+    def parents_of(self, index):
+        """
+        Get the parent SHAs of the commit in the given row.
+
+        :param index: The row index.
+        :type index: int
+
+        :return: The hexadecimal parent SHAs.
+        :rtype: list
+        """
+        start, end = self._parent_offsets[index], self._parent_offsets[index + 1]
+        return [self._parents[position * 20:(position + 1) * 20].hex() for position in range(start, end)]
+
+    def commit(self, index):
+        """
+        Get the commit in the given row in the dictionary format of `retrieve_all_commits_with_stats_and_logging`.
+
+        :param index: The row index.
+        :type index: int
+
+        :return: The commit dictionary.
+        :rtype: dict
+        """
+        zone = timezone(timedelta(minutes=self._tz_offsets[index]))
+        return {
+            "sha": self.sha_of(index),
+            "author": self.authors[self._author_codes[index]],
+            "date": datetime.fromtimestamp(self._timestamps[index], zone),
+            "message": self.messages[index],
+            "parents": self.parents_of(index),
+            "loc_added": self._loc_added[index],
+            "loc_deleted": self._loc_deleted[index],
+        }
+
+    def to_dataframe(self, hex_shas=False):
+        """
+        Convert the table to a pandas DataFrame.
+
+        Numeric columns share memory with the table and the author column is categorical on top of the author codes.
+        Parents are left out, use `parent_offsets` and `parents` for them.
+
+        :param hex_shas: Whether to convert the SHAs to hexadecimal strings (which copies them), defaults to False.
+        :type hex_shas: bool, optional
+
+        :return: A DataFrame with the columns sha, author, timestamp, tz_offset, message, loc_added and loc_deleted.
+        :rtype: pd.DataFrame
+        """
+        shas = self.shas
+        return pd.DataFrame({
+            "sha": [bytes(sha).hex() for sha in shas] if hex_shas else shas,
+            "author": pd.Categorical.from_codes(self.author_codes, categories=self.authors) if self.authors else pd.Categorical([]),
+            "timestamp": self.timestamps,
+            "tz_offset": self.tz_offsets,
+            "message": self.messages,
+            "loc_added": self.loc_added,
+            "loc_deleted": self.loc_deleted,
+        }, copy=False)
+
+    def to_arrow(self):
+        """
+        Convert the table to a pyarrow Table, sharing the buffers of the table where Arrow allows it.
+
+        Requires the optional `pyarrow` package.
+
+        :return: A table with the columns sha, author, timestamp, tz_offset, message, parents, loc_added and loc_deleted.
+        :rtype: pyarrow.Table
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("CommitTable.to_arrow requires the optional package 'pyarrow'.") from e
+
+        sha_type = pa.binary(20)
+        shas = pa.FixedSizeBinaryArray.from_buffers(sha_type, len(self), [None, pa.py_buffer(self._shas)])
+        parents = pa.FixedSizeBinaryArray.from_buffers(sha_type, len(self._parents) // 20, [None, pa.py_buffer(self._parents)])
+        return pa.table({
+            "sha": shas,
+            "author": pa.DictionaryArray.from_arrays(pa.array(self.author_codes), pa.array(self.authors, type=pa.string())),
+            "timestamp": pa.array(self.timestamps),
+            "tz_offset": pa.array(self.tz_offsets),
+            "message": pa.array(self.messages, type=pa.string()),
+            "parents": pa.LargeListArray.from_arrays(pa.array(self.parent_offsets), parents),
+            "loc_added": pa.array(self.loc_added),
+            "loc_deleted": pa.array(self.loc_deleted),
+        })
+
+def load_commit_table(repo_path=".", revisions=None, workers=1):
+    """
+    Load the commit history (including parents, stats) into a compact `CommitTable`.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param revisions: Revisions to traverse instead of all refs, see `iter_all_commits_with_stats`. Defaults to None (`--all`).
+    :type revisions: list, optional
+    :param workers: Number of concurrent Git processes, see `iter_all_commits_with_stats_parallel`. Defaults to 1.
+    :type workers: int, optional
+
+    :return: The table holding all traversed commits in log order.
+    :rtype: CommitTable
+    """
+    if workers > 1:
+        commits = iter_all_commits_with_stats_parallel(repo_path, revisions=revisions, workers=workers)
+    else:
+        commits = iter_all_commits_with_stats(repo_path, revisions=revisions)
+    return CommitTable.from_commits(commits)
+
+def retrieve_ref_tips(repo_path="."):
+    """
+    Retrieve the commits all refs (and HEAD) currently point to.
+
+    The result describes the state of the history traversed by `git log --all` and is used as a watermark for
+    incremental crawls. Annotated tags are peeled to their commits; refs to other objects are ignored.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+
+    :return: A sorted list of unique commit SHAs.
+    :rtype: list
+    """
+    return sorted(set(iter_ref_commits(repo_path)))
+
+def iter_ref_commits(repo_path="."):
+    """
+    Iterate over the commits HEAD and all refs point to, in the order `git log --all` starts from them.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+
+    :return: A generator yielding the commit SHA of each ref sorted by name, then of HEAD (if it has one). Annotated
+             tags are peeled to their commits; refs to other objects are left out. SHAs may repeat.
+    :rtype: generator
+    """
+    ref_args = ["for-each-ref", "--format=%(objectname) %(objecttype) %(*objectname) %(*objecttype)"]
+    for line in iter_git_command_lines(ref_args, cwd=repo_path):
+        parts = line.split(" ")
+        if len(parts) != 4:
+            continue
+        object_sha, object_type, peeled_sha, peeled_type = parts
+        if object_type == "commit":
+            yield object_sha
+        elif peeled_type == "commit":
+            yield peeled_sha
+
+    head = run_git_command(["rev-parse", "--verify", "--quiet", "HEAD^{commit}"], cwd=repo_path)
+    if head:
+        yield head
+
+def load_commit_graph(repo_path=".", commit_table=None):
+    """
+    Load the parents, committer dates, author dates and authors of all commits into a `CommitGraph`.
+
+    A single `git rev-list --all --parents` fills a `CommitTable` (without line stats) and replaces the Git processes
+    that would otherwise answer ancestry questions one branch, merge or commit at a time. The starting points of
+    `--all` are kept in `ref_tips`, so `commit_graph.walk([main] + commit_graph.ref_tips)` lists the same commits as
+    `git log main --all`.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param commit_table: A table that was already loaded, e.g. by `load_commit_table`, to build the graph on instead
+                         of reading the history again. Its authors are the e-mail addresses and, lacking committer
+                         dates, `walk` orders by author date. Defaults to None.
+    :type commit_table: CommitTable, optional
+
+    :return: The graph of all commits reachable from HEAD and the refs.
+    :rtype: CommitGraph
+    """
+    if commit_table is None:
+        commit_table = CommitTable()
+        graph_args = ["rev-list", "--all", "--parents", "--format=%ct %aI %an"]
+        commit_and_parents = None
+        for line in iter_git_command_lines(graph_args, cwd=repo_path):
+            # Each commit is a "commit <sha> <parents>" line followed by the formatted line
+            if commit_and_parents is None:
+                if line.startswith("commit "):
+                    commit_and_parents = line.split()[1:]
+                continue
+            timestamp, author_date, author = (line.split(" ", 2) + [""])[:3]
+            commit_table.append({
+                "sha": commit_and_parents[0],
                 "author": author,
-                "date": datetime.fromisoformat(date_str),
-                "message": message,
-                "parents": parent_shas,
+                "date": datetime.fromisoformat(author_date),
+                "committer_timestamp": int(timestamp),
+                "parents": commit_and_parents[1:],
+                # Only the history is needed, no stats are read
+                "message": "",
                 "loc_added": 0,
                 "loc_deleted": 0,
-            }
+            })
+            commit_and_parents = None
+
+    commit_graph = CommitGraph(commit_table)
+    commit_graph.ref_tips = [tip for tip in iter_ref_commits(repo_path) if tip in commit_graph]
+    logging.info(f"Loaded the commit graph with {len(commit_graph)} commits.")
+    return commit_graph
 
-            processed += 1
-            # Log every 1,000 commits (adjust this interval as needed)
-            if processed % 1000 == 0:
-                logging.info(f"Processed {processed} of {total_commits} commits...")
-        
-        else:
-            # Parse numstat lines: <added>\t<deleted>\t<filename>
-            parts = line.split("\t")
-            if len(parts) == 3:
-                added_str, deleted_str, _filename = parts
-                added = int(added_str) if added_str.isdigit() else 0
-                deleted = int(deleted_str) if deleted_str.isdigit() else 0
-                
-                if current_commit is not None:
-                    current_commit["loc_added"] += added
-                    current_commit["loc_deleted"] += deleted
-    
-    # Add the last commit processed
-    if current_commit:
-        detailed_commits.append(current_commit)
+def is_history_rewritten(old_tips, new_tips, repo_path="."):
+    """
+    Check whether commits reachable from earlier ref tips are no longer reachable from the current ones.
 
-    logging.info(f"Finished processing {processed} commits in total.")
+    This happens after force pushes, rebases or deletions of unmerged branches. An incremental crawl would then keep
+    commits a full crawl no longer reports, so callers should fall back to a full crawl.
 
-    # Optional: Cross-check final count
-    if processed != total_commits:
-        logging.debug(f"Expected {total_commits} commits but only parsed {processed}")
+    :param old_tips: The ref tips of the previous crawl.
+    :type old_tips: list
+    :param new_tips: The current ref tips.
+    :type new_tips: list
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
 
-    return detailed_commits
+    :return: True if the history was rewritten or the old tips no longer exist in the repository, False otherwise.
+    :rtype: bool
+    """
+    if not old_tips:
+        return False
+
+    revisions = list(old_tips) + [f"^{tip}" for tip in new_tips]
+    count_output = run_git_command(["rev-list", "--count", "--stdin"], cwd=repo_path, input_text="\n".join(revisions) + "\n")
+    try:
+        return int(count_output) > 0
+    except (TypeError, ValueError):
+        # Old tips that were garbage collected cannot be resolved anymore
+        return True
 
 def calculate_diff_stats(repo_path, merge_commit_sha):
     """
@@ -700,16 +1896,57 @@ def retrieve_branch_information(branch_name, retrieval_arguments, repo_path, mer
     :return: A dictionary containing branch information.
     :rtype: dict
     """
+    commits_on_branch = run_git_command(retrieval_arguments, repo_path=repo_path)
+    return summarize_branch_commits(branch_name, commits_on_branch.splitlines() if commits_on_branch else [], merged=merged)
+
+def retrieve_branch_information_from_graph(branch_name, revisions, commit_graph, merged=False):
+    """
+    Retrieve information for a specific branch from the commit graph instead of a Git process.
+
+    :param branch_name: The name of the branch.
+    :type branch_name: str
+    :param revisions: The SHAs whose commits belong to the branch, excluded ones prefixed with "^", see `CommitGraph.walk`.
+    :type revisions: list
+    :param commit_graph: The graph of all commits, see `load_commit_graph`.
+    :type commit_graph: CommitGraph
+    :param merged: Indicates if the branch is merged, defaults to False.
+    :type merged: bool, optional
+
+    :return: A dictionary containing branch information, the same as `retrieve_branch_information` returns.
+    :rtype: dict
+    """
+    commits = commit_graph.walk(revisions)
+    # Only the first and last commit are summarized, the others are just listed
+    commit_lines = []
+    for sha in commits[:1] + commits[1:][-1:]:
+        author_date, author = commit_graph.commit_info(sha)
+        # Same format as "--pretty=format:%H'%ad'%an --date=iso-strict"
+        commit_lines.append(f"{sha}'{author_date}'{author}")
+    branch = summarize_branch_commits(branch_name, commit_lines, merged=merged)
+    branch['commits'] = commits
+    return branch
+
+def summarize_branch_commits(branch_name, commit_lines, merged=False):
+    """
+    Summarize the commits of a branch, including the first and last commit details.
 
+    :param branch_name: The name of the branch.
+    :type branch_name: str
+    :param commit_lines: The commits of the branch in log order, formatted as "%H'%ad'%an".
+    :type commit_lines: list
+    :param merged: Indicates if the branch is merged, defaults to False.
+    :type merged: bool, optional
+
+    :return: A dictionary containing branch information.
+    :rtype: dict
+    """
     commits = []
-    commits_on_branch = run_git_command(retrieval_arguments, repo_path=repo_path)
-    
-    if commits_on_branch:
+    if commit_lines:
     
         first_commit = None
         last_commit = None
         
-        for commit in commits_on_branch.splitlines():
+        for commit in commit_lines:
             commit_args = commit.split("'")
             if len(commit_args) < 3:
                 logging.debug(f"Unvalid commit output for branch {branch_name} {commit}")
@@ -769,64 +2006,319 @@ def format_fast_forwarded_branch(branch):
             'merged' : 'fast-forwarded'
             }
         
-import os
-def retrieve_branch_data_new(repo_path = ".", main_branch="main", path_to_environment = '.'):
+def find_merge_commits(branch_names, repo_path=".", target="HEAD", commit_graph=None):
+    """
+    Find the merge commits that brought the tips of the given branches into the target branch.
+
+    This answers the same question as `git when-merged -c <branch>` for all branches at once: the merge commit is the
+    oldest commit on the first-parent history of the target that has the branch tip as an ancestor. The parents of
+    all commits of the target are loaded once, then its first-parent history is walked from the oldest commit on,
+    attributing each commit reached through a second (or later) parent to the merge that reached it first.
+
+    :param branch_names: The branch names, e.g. as listed by `git branch --all --merged`.
+    :type branch_names: list
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param target: The branch the others were merged into, defaults to "HEAD" like `git when-merged`.
+    :type target: str, optional
+    :param commit_graph: A graph containing all commits of the target, loaded by `load_commit_graph` if None.
+    :type commit_graph: CommitGraph, optional
+
+    :return: A dictionary mapping each branch name to the SHA of its merge commit, or to None if its tip is directly
+             on the first-parent history of the target, including the tip of the target itself. Branches whose tip is
+             not a commit or is not contained in the target are left out.
+    :rtype: dict
+    """
+    object_reader = get_object_reader(repo_path)
+    target_info = object_reader.object_info(f"{target}^{{commit}}")
+    if target_info is None:
+        logging.error(f"Cannot resolve {target} in {repo_path}")
+        return {}
+    target_sha = target_info["sha"]
+
+    branch_tips = {}
+    for branch_name in branch_names:
+        info = object_reader.object_info(f"{branch_name}^{{commit}}")
+        if info is None:
+            logging.debug(f"Cannot resolve branch {branch_name}")
+            continue
+        branch_tips[branch_name] = info["sha"]
+
+    if commit_graph is None:
+        commit_graph = load_commit_graph(repo_path)
+    first_parent_history = commit_graph.first_parent_history(target_sha)
+
+    # Walk the first-parent history from the oldest commit on. All ancestors of older commits are visited already,
+    # so the commits newly reached from a merge are exactly the ones it brought in.
+    wanted_tips = set(branch_tips.values())
+    merged_by = {}
+    visited = set(first_parent_history)
+    for merge_commit in reversed(first_parent_history):
+        stack = [parent for parent in commit_graph.parents(merge_commit)[1:] if parent not in visited]
+        while stack:
+            commit = stack.pop()
+            if commit in visited:
+                continue
+            visited.add(commit)
+            if commit in wanted_tips:
+                merged_by[commit] = merge_commit
+            stack.extend(parent for parent in commit_graph.parents(commit) if parent not in visited)
+
+    first_parent_commits = set(first_parent_history)
+    merge_commits = {}
+    for branch_name, tip in branch_tips.items():
+        # Like "Commit is directly on this branch" of `git when-merged`, also for the tip of the target itself
+        if tip in first_parent_commits:
+            merge_commits[branch_name] = None
+        elif tip in merged_by:
+            merge_commits[branch_name] = merged_by[tip]
+        else:
+            logging.debug(f"Branch {branch_name} is not contained in {target}")
+    return merge_commits
+
+def retrieve_branch_data_new(repo_path = ".", main_branch="main", path_to_environment = '.', summary=False, commits_path=None, workers=1):
     """
     Retrieve data for all branches in the repository.
 
     This function retrieves information for all branches in the repository, including unmerged and merged branches.
+    The main branch entry lists the commits of all refs, so in large repositories its commit list is as long as the
+    history. In summary mode the lists are replaced by their lengths and can be written to a separate edge file.
 
     :param repo_path: Path to the local Git repository, defaults to ".".
     :type repo_path: str, optional
     :param main_branch: Name of the main branch, defaults to "main".
     :type main_branch: str, optional
+    :param path_to_environment: No longer used, the merge commits are found by `find_merge_commits`. Defaults to '.'.
+    :type path_to_environment: str, optional
+    :param summary: Whether to replace the `commits` of each branch with their number `commit_count`, defaults to False.
+    :type summary: bool, optional
+    :param commits_path: Path of a CSV file with the columns branch_name and commit_sha that receives the commits of
+                         all branches in the order of their `commits`, defaults to None (no file).
+    :type commits_path: str, optional
+    :param workers: Number of processes listing the commits of the branches, capped at the number of CPUs. The
+                    result is the same for any number. Defaults to 1.
+    :type workers: int, optional
 
     :return: A list of dictionaries containing branch information.
     :rtype: list
     """
+    branches = []
+    with open(commits_path, 'w', newline='') if commits_path else contextlib.nullcontext() as commits_file:
+        commits_writer = None
+        if commits_file is not None:
+            commits_writer = csv.writer(commits_file)
+            commits_writer.writerow(["branch_name", "commit_sha"])
+
+        for branch in iter_branch_data(repo_path, main_branch, workers=workers):
+            # Each commit list is only held until its branch is summarized
+            if commits_writer is not None and branch['commits']:
+                commits_writer.writerows((branch['branch_name'], commit_sha) for commit_sha in branch['commits'])
+            branches.append(summarize_branch(branch) if summary else branch)
+    return branches
+
+def summarize_branch(branch):
+    """
+    Replace the commit list of a branch dictionary with the number of commits.
+
+    :param branch: A dictionary as returned by `retrieve_branch_information` or `format_fast_forwarded_branch`.
+    :type branch: dict
+
+    :return: The same dictionary with `commit_count` (None if `commits` is None) in place of `commits`.
+    :rtype: dict
+    """
+    return {
+        ('commit_count' if key == 'commits' else key): (len(value) if value is not None else None) if key == 'commits' else value
+        for key, value in branch.items()
+    }
+
+def iter_branch_data(repo_path=".", main_branch="main", workers=1):
+    """
+    Iterate over the data of all branches in the repository, see `retrieve_branch_data_new`.
+
+    The commits of the branches are listed from one commit graph loaded by `load_commit_graph`. With several workers,
+    the branches are listed by a pool of processes sharing the graph, see `iter_branch_data_parallel`. The number of
+    workers is capped at the number of CPUs, as the workers only compute.
+
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param main_branch: Name of the main branch, defaults to "main".
+    :type main_branch: str, optional
+    :param workers: Number of worker processes, defaults to 1 (no pool).
+    :type workers: int, optional
+
+    :return: A generator yielding a dictionary containing branch information per branch, the main branch last.
+    :rtype: generator
+    """
+    commit_graph = load_commit_graph(repo_path)
+    branch_jobs = iter_branch_jobs(repo_path, main_branch, commit_graph)
+    workers = min(workers, os.cpu_count() or 1)
+    if workers > 1:
+        yield from iter_branch_data_parallel(branch_jobs, commit_graph, workers=workers)
+    else:
+        for branch_job in branch_jobs:
+            yield retrieve_branch_job(branch_job, commit_graph)
+
+def iter_branch_jobs(repo_path, main_branch, commit_graph):
+    """
+    Iterate over the branches of the repository together with the revisions that select their commits.
+
+    :param repo_path: Path to the local Git repository.
+    :type repo_path: str
+    :param main_branch: Name of the main branch.
+    :type main_branch: str
+    :param commit_graph: The graph of all commits, see `load_commit_graph`.
+    :type commit_graph: CommitGraph
+
+    :return: A generator yielding (branch name, revisions, merged) tuples for `retrieve_branch_job`, the main branch
+             last. The revisions are None for fast-forwarded branches.
+    :rtype: generator
+    """
+    object_reader = get_object_reader(repo_path)
+
+    def resolve_commit(name):
+        info = object_reader.object_info(f"{name}^{{commit}}")
+        return info["sha"] if info is not None and info["sha"] in commit_graph else None
+
+    # Nothing is listed for a branch or main branch that cannot be resolved, like git fails for it
+    main_sha = resolve_commit(main_branch)
+
     branch_args = ["branch", "--all", "--no-merged"]
     unmerged = run_git_command(branch_args, None, repo_path)
     
     unmerged_split = unmerged.splitlines()
     logging.info(f"Retrieved {len(unmerged_split)} unmerged branches.")
-    branches = []
     
     for branch_name in unmerged_split:
         branch_name = branch_name.split(' -> ')[-1].strip()
         if validate_branch(branch_name):
-            unmerged_args = ["show", "--summary", branch_name, "--pretty=format:%H'%ad'%an", "--date=iso-strict", "--no-patch", f"^{main_branch}"]
-            branches.append(retrieve_branch_information(branch_name, unmerged_args,repo_path=repo_path))
+            # Same commits as `git show <branch> ^<main_branch>`
+            branch_sha = resolve_commit(branch_name)
+            revisions = [branch_sha, f"^{main_sha}"] if branch_sha and main_sha else []
+            yield branch_name, revisions, False
     
     branch_args = ["branch", "--all", "--merged"]
     merged = run_git_command(branch_args, None, repo_path)
     merged_split = merged.splitlines()
     logging.info(f"Retrieved {len(merged_split)} unmerged branches.")
     
-    for branch_name in merged_split:
-        branch_name = clear_branch_name(branch_name)
-        if validate_branch(branch_name):
-            
-            merge_sha = run_console_command([f"{path_to_environment}/git-when-merged", "-c", branch_name], path=repo_path)
-            
-            if merge_sha:
-                if "Commit is directly on this branch" in merge_sha:
-                    branches.append(format_fast_forwarded_branch(branch_name))
-                else:
-                    merged_args = ["log", f"{merge_sha}^-",  "--pretty=format:%H'%ad'%an", "--date=iso-strict"]
-                    branches.append(retrieve_branch_information(branch_name, merged_args,repo_path=repo_path, merged=True))
-            else:
-                logging.debug(f"No merge sha for merged branch {branch_name}")
-    
-    main_args = ["log", main_branch, "--all", "--pretty=format:%H'%ad'%an", "--date=iso-strict"]
-    branches.append(retrieve_branch_information(main_branch, main_args, repo_path=repo_path, merged=True))
+    merged_names = [branch_name for branch_name in map(clear_branch_name, merged_split) if validate_branch(branch_name)]
+    # Merged into HEAD, the same branch `git branch --merged` compares with
+    merge_shas = find_merge_commits(merged_names, repo_path=repo_path, commit_graph=commit_graph)
+
+    for branch_name in merged_names:
+        if branch_name not in merge_shas:
+            logging.debug(f"No merge sha for merged branch {branch_name}")
+            continue
+
+        merge_sha = merge_shas[branch_name]
+        if merge_sha is None:
+            yield branch_name, None, 'fast-forwarded'
+        else:
+            # Same commits as `git log <merge>^-`
+            revisions = [f"^{commit_graph.parents(merge_sha)[0]}", merge_sha]
+            yield branch_name, revisions, True
     
-    return branches
+    # Same commits as `git log <main_branch> --all`
+    revisions = [main_sha] + commit_graph.ref_tips if main_sha else []
+    yield main_branch, revisions, True
 
-def process_commits_individually(commit_list, repo_path, branch_commits, error_path):
+def retrieve_branch_job(branch_job, commit_graph):
+    """
+    Retrieve the information of a branch from a tuple yielded by `iter_branch_jobs`.
+
+    :param branch_job: A tuple of the branch name, the revisions selecting its commits and whether it is merged.
+    :type branch_job: tuple
+    :param commit_graph: The graph of all commits, see `load_commit_graph`.
+    :type commit_graph: CommitGraph
+
+    :return: A dictionary containing branch information.
+    :rtype: dict
+    """
+    branch_name, revisions, merged = branch_job
+    if revisions is None:
+        return format_fast_forwarded_branch(branch_name)
+    return retrieve_branch_information_from_graph(branch_name, revisions, commit_graph, merged=merged)
+
+branch_worker = {}
+
+def init_branch_worker(commit_graph):
+    """
+    Set up a worker process of `iter_branch_data_parallel` with the commit graph.
+
+    Forked workers share the memory of the graph with the parent process, other platforms receive a copy.
+    """
+    branch_worker["commit_graph"] = commit_graph
+
+def retrieve_branch_batch(branch_jobs):
+    """
+    Retrieve the information of several branches in a worker process of `iter_branch_data_parallel`.
+
+    :return: A list of branch dictionaries in the order of the given jobs.
+    :rtype: list
+    """
+    return [retrieve_branch_job(branch_job, branch_worker["commit_graph"]) for branch_job in branch_jobs]
+
+def iter_branch_data_parallel(branch_jobs, commit_graph, workers=4, batch_size=8):
+    """
+    Retrieve the information of many branches (see `retrieve_branch_job`) in a pool of worker processes.
+
+    The workers only walk the commit graph and run no Git processes. The branches are handed out in batches and the results are yielded in the order of `branch_jobs`; only
+    `workers * 2` batches are in flight at a time, so finished branches do not pile up if the consumer is slower.
+
+    :param branch_jobs: The tuples yielded by `iter_branch_jobs`.
+    :type branch_jobs: iterable
+    :param commit_graph: The graph of all commits, see `load_commit_graph`.
+    :type commit_graph: CommitGraph
+    :param workers: Number of worker processes, defaults to 4.
+    :type workers: int, optional
+    :param batch_size: Number of branches per batch, defaults to 8.
+    :type batch_size: int, optional
+
+    :return: A generator of branch dictionaries.
+    :rtype: generator
+    """
+    job_iterator = iter(branch_jobs)
+    batches = iter(lambda: list(itertools.islice(job_iterator, batch_size)), [])
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_branch_worker, initargs=(commit_graph,)) as executor:
+        # Keep a bounded window of batches in flight and consume them in order
+        pending = collections.deque()
+        for batch in itertools.islice(batches, workers * 2):
+            pending.append(executor.submit(retrieve_branch_batch, batch))
+
+        while pending:
+            results = pending.popleft().result()
+            next_batch = next(batches, None)
+            if next_batch is not None:
+                pending.append(executor.submit(retrieve_branch_batch, next_batch))
+
+            yield from results
+
+def retrieve_branch_listing(repo_path):
+    """
+    Retrieve the lines of `git branch -a` together with the commits the listed branches point to.
+
+    :param repo_path: Path to the local Git repository.
+    :type repo_path: str
+
+    :return: A list of tuples of the listed line (e.g. "* main" or "  remotes/origin/HEAD -> origin/main") and the SHA
+             of its commit, in the order of `git branch -a`.
+    :rtype: list
+    """
+    branch_lines = run_git_command(["branch", "-a"], repo_path=repo_path).splitlines()
+    # Same filter and sorting as above, so the lines match
+    branch_tips = run_git_command(["branch", "-a", "--format=%(objectname)"], repo_path=repo_path).splitlines()
+    if len(branch_lines) != len(branch_tips):
+        raise ValueError(f"The branch listing of {repo_path} changed while it was retrieved.")
+    return list(zip(branch_lines, branch_tips))
+
+def process_commits_individually(commit_list, repo_path, branch_commits, error_path, commit_graph=None):
     """
     Process commits individually to determine their branches.
 
     This function processes a list of commits to determine which branches they belong to and logs unreferenced commits.
+    The branches containing the commits are labeled in one pass over the commit graph and listed like
+    `git branch -a --contains` would.
 
     :param commit_list: List of commit hashes to process.
     :type commit_list: list
@@ -836,11 +2328,18 @@ def process_commits_individually(commit_list, repo_path, branch_commits, error_p
     :type branch_commits: dict
     :param error_path: Path to the file where unreferenced commits will be logged.
     :type error_path: str
+    :param commit_graph: The graph of all commits, loaded by `load_commit_graph` if None.
+    :type commit_graph: CommitGraph, optional
 
     :return: Updated dictionary of branch commits.
     :rtype: dict
     """
     unreferenced_commits = []
+    if commit_graph is None:
+        commit_graph = load_commit_graph(repo_path)
+    branch_listing = retrieve_branch_listing(repo_path)
+    # Bit i of a label stands for the i-th listed branch
+    containment_labels = commit_graph.containment_labels([tip for _, tip in branch_listing])
     
     logging.info(f"Processing {len(commit_list)} commits for branches individually...")
 
@@ -849,21 +2348,16 @@ def process_commits_individually(commit_list, repo_path, branch_commits, error_p
         counter += 1
         if counter % 1000 == 0:
             logging.info(f"Processed {counter} of {len(commit_list)} commits")
-        try:
-            # Check which branches contain the commit
-            branches_args = ["branch", "-a", "--contains", commit_hash]
-            branches_output = run_git_command(branches_args, repo_path=repo_path)
-
-            if branches_output:
-                # Add the commit to the relevant branches
-                for branch_name in branches_output.splitlines():
-                    branch_name = grab_branch_name(branch_name)  # Normalize branch name
-                    branch_commits.setdefault(branch_name, []).append(commit_hash)
-            else:
-                # No branches contain this commit
-                unreferenced_commits.append(commit_hash)
-        except Exception as e:
-            logging.error(f"Error processing commit {commit_hash}: {e}")
+        # Check which branches contain the commit
+        label = containment_labels.get(commit_hash, 0)
+
+        if label:
+            # Add the commit to the relevant branches
+            for index in bitmask_indices(label):
+                branch_name = grab_branch_name(branch_listing[index][0])  # Normalize branch name
+                branch_commits.setdefault(branch_name, []).append(commit_hash)
+        else:
+            # No branches contain this commit
             unreferenced_commits.append(commit_hash)
 
     # Write unreferenced commits to an error file
@@ -898,13 +2392,12 @@ def retrieve_branches(repo_path):
 
     # Retrieve all commits for all branches in one call
     commits_args = ["log", "--all", "--pretty=format:%H %D", "--no-merges", "--date=iso-strict"]
-    commits_output = run_git_command(commits_args, repo_path=repo_path)
 
     branch_commits = {}
     pull_request_refs = {}
     check_manually = []
 
-    for line in commits_output.splitlines():
+    for line in iter_git_command_lines(commits_args, repo_path=repo_path):
         parts = line.split(" ", 1)
         
         if len(parts) < 2 or parts[1] == "":
@@ -935,10 +2428,10 @@ def retrieve_branches(repo_path):
     
     # Retrieve reflog data for all branches in one call
     reflog_args = ["reflog", "show", "--all", "--pretty=format:%H,%cn,%cd", "--date=iso-strict"]
-    reflog_output = run_git_command(reflog_args, repo_path=repo_path)
-
     branch_reflogs = {}
-    for line in reflog_output.splitlines():
+    for line in iter_git_command_lines(reflog_args, repo_path=repo_path):
+        if not line:
+            continue
         sha, creator_name, creation_date_str = line.split(",", 2)
         branch_reflogs[sha] = (creator_name.strip(), creation_date_str.strip())
 
@@ -978,12 +2471,16 @@ Functions for retrieving file-specific data from a local Git repository
 Due to the high amount of files in a repository per commit, these function can take up more time than others.
 """
 
+# Word-diff stats of a file without any changed lines
+EMPTY_WORD_DIFF_STATS = {"calculated_loc_added": 0, "calculated_loc_removed": 0, "calculated_loc_changed": 0}
+
 def calculate_file_changes(commit_hash, file_path, repo_path="."):
     """
     Calculate the number of lines added, deleted, and changed for a given file in a commit.
 
     This function runs `git diff` with `--word-diff` to calculate the changes in a file for a specific commit.
     It String-matches the result to determine if an entire line was added, removed or if only parts were changed.
+    To calculate the changes of all files of a commit, `calculate_commit_file_changes` needs a single `git diff` only.
 
     :param commit_hash: The hash of the commit.
     :type commit_hash: str
@@ -996,17 +2493,98 @@ def calculate_file_changes(commit_hash, file_path, repo_path="."):
     :rtype: dict
     """
     # Run git diff with --word-diff to calculate changes
-    git_diff_args = ["diff", "--word-diff-regex=.", f"{commit_hash}^!", "--", file_path]
+    git_diff_args = ["diff", "--word-diff-regex=.", f"{commit_hash}^!", "--", unquote_git_path(file_path)]
     diff_output = run_git_command(git_diff_args, cwd=repo_path)
 
     if not diff_output:
-        return {"loc_added": 0, "loc_removed": 0, "loc_changed": 0}
+        return dict(EMPTY_WORD_DIFF_STATS)
+
+    return count_word_diff_lines(diff_output.splitlines())
+
+def calculate_commit_file_changes(commit_hash, repo_path=".", file_paths=None, pathspecs=None):
+    """
+    Calculate the number of lines added, deleted, and changed for all files of a commit with a single `git diff`.
+
+    The word-diff of the whole commit is split at the `diff --git` header of each file, and each part is counted like
+    the output of `calculate_file_changes`. Rename detection is turned off, so every file gets its own part, the
+    same as when the diff is limited to that file.
+
+    :param commit_hash: The hash of the commit.
+    :type commit_hash: str
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param file_paths: The (unquoted) paths of the files changed in the commit, if known. Headers naming other paths are
+                       then treated as file content. Defaults to None.
+    :type file_paths: collection, optional
+    :param pathspecs: Pathspecs limiting the diff, see `build_pathspecs`. Defaults to None (all files).
+    :type pathspecs: list, optional
+
+    :return: A dictionary mapping each changed (unquoted) file path to its stats as returned by `calculate_file_changes`.
+             Files without changed lines may be missing.
+    :rtype: dict
+    """
+    git_diff_args = ["diff", "--no-renames", "--src-prefix=a/", "--dst-prefix=b/", "--word-diff-regex=.", f"{commit_hash}^!", "--"] + (pathspecs or [])
+
+    file_stats = {}
+    file_path = None
+    file_lines = []
+    header_path = None
+    for line in iter_git_command_lines(git_diff_args, cwd=repo_path):
+        # Content lines are not prefixed in a word-diff, so a header only counts if it names the same path on both
+        # sides and is followed by an extended header line
+        if header_path is not None and line.startswith(DIFF_EXTENDED_HEADERS):
+            if file_path is not None:
+                file_stats[file_path] = count_word_diff_lines(file_lines[:-1])
+            file_path = header_path
+            file_lines = file_lines[-1:]
+        header_path = parse_diff_header_path(line) if line.startswith("diff --git ") else None
+        if file_paths is not None and header_path not in file_paths:
+            header_path = None
+        file_lines.append(line)
+
+    if file_path is not None:
+        file_stats[file_path] = count_word_diff_lines(file_lines)
+    return file_stats
+
+# Lines that directly follow the `diff --git` header of a file
+DIFF_EXTENDED_HEADERS = ("index ", "old mode ", "new mode ", "deleted file mode ", "new file mode ", "Binary files ")
+
+def parse_diff_header_path(line):
+    """
+    Get the path from a `diff --git a/<path> b/<path>` header of a diff without renames.
+
+    :param line: The header line.
+    :type line: str
+
+    :return: The unquoted path, or None if the line does not name the same path on both sides.
+    :rtype: str or None
+    """
+    paths = line[len("diff --git "):]
+    middle = (len(paths) - 1) // 2
+    if paths[middle:middle + 1] != " ":
+        return None
+
+    old_path = unquote_git_path(paths[:middle])
+    new_path = unquote_git_path(paths[middle + 1:])
+    if not (old_path.startswith("a/") and new_path.startswith("b/") and old_path[2:] == new_path[2:]):
+        return None
+    return new_path[2:]
 
+def count_word_diff_lines(lines):
+    """
+    Count the lines added, removed and changed in the output of `git diff --word-diff-regex=.`.
+
+    :param lines: The lines of the word-diff.
+    :type lines: iterable
+
+    :return: A dictionary containing the number of lines added, removed, and changed.
+    :rtype: dict
+    """
     added_lines = 0
     removed_lines = 0
     changed_lines = 0
 
-    for line in diff_output.splitlines():
+    for line in lines:
         stripped_line = line.strip()
         
         # Count Added Lines
@@ -1056,17 +2634,341 @@ def retrieve_file_content(commit_hash, file_path, repo_path="."):
     :return: The content of the file as a string, or None if the file does not exist in the commit.
     :rtype: str or None
     """
-    # Verify if the file exists in the commit
-    verify_args = ["ls-tree", "-r", "--name-only", commit_hash]
-    files_in_commit = run_git_command(verify_args, repo_path=repo_path)
-    
-    if file_path not in files_in_commit.splitlines():
-        # print(f"Skipping: File {file_path} does not exist in commit {commit_hash}")
+    # Read the blob through the shared cat-file process, it is None if the file does not exist in the commit
+    content = get_object_reader(repo_path).read_blob(commit_hash, unquote_git_path(file_path))
+    if content is None:
         return None
-    
-    # If it exists, proceed to show the file
-    git_args = ["show", f"{commit_hash}:{file_path}"]
-    return run_git_command(git_args, repo_path=repo_path)
+
+    return decode_git_output(content).strip()
+
+def retrieve_blob_stats(blob_sha, repo_path=".", cache=None):
+    """
+    Retrieve the line count and size of a blob, counting lines the same way generate_file_data counts the lines of
+    `retrieve_file_content`.
+
+    :param blob_sha: The SHA of the blob.
+    :type blob_sha: str
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param cache: Cache that is checked before and filled after reading the blob, defaults to None.
+    :type cache: blob_cache.BlobStatsCache, optional
+
+    :return: A dictionary with the keys line_count and size, or None if the object is not a blob or cannot be read.
+    :rtype: dict or None
+    """
+    if cache is not None:
+        stats = cache.get(blob_sha)
+        if stats is not None:
+            return stats
+
+    result = get_object_reader(repo_path).read_object(blob_sha)
+    if result is None or result[0]["type"] != "blob":
+        return None
+
+    content = decode_git_output(result[1]).strip()
+    stats = {
+        "line_count": content.count('\n') + (1 if content else 0),
+        "size": result[0]["size"]
+    }
+    if cache is not None:
+        cache.put(blob_sha, stats["line_count"], stats["size"])
+    return stats
+
+def retrieve_blob_line_count(blob_sha, repo_path=".", cache=None):
+    """
+    Count the lines of a blob, see `retrieve_blob_stats`.
+
+    :return: The number of lines, or 0 if the blob is empty or cannot be read.
+    :rtype: int
+    """
+    stats = retrieve_blob_stats(blob_sha, repo_path=repo_path, cache=cache)
+    return stats["line_count"] if stats else 0
+
+# Git mode of submodules, which are listed with the SHA of a commit in another repository
+SUBMODULE_MODE = "160000"
+
+def build_line_count_skip_rules(file_endings="", path_patterns="", skip_binary=False, max_size=None):
+    """
+    Build the rules deciding which file contents are not read to count their lines, see `get_line_count_skip_reason`.
+
+    :param file_endings: Comma-separated file endings (case-insensitive), e.g. ".png,.min.js". Defaults to "".
+    :type file_endings: str, optional
+    :param path_patterns: Comma-separated glob patterns matched against the full path, e.g. "vendor/*,*/generated/*". Defaults to "".
+    :type path_patterns: str, optional
+    :param skip_binary: Whether files that Git considers binary (numstat "-") are skipped, defaults to False.
+    :type skip_binary: bool, optional
+    :param max_size: Size in bytes above which contents are not read, defaults to None (no limit).
+    :type max_size: int, optional
+
+    :return: The skip rules.
+    :rtype: dict
+    """
+    return {
+        "file_endings": tuple(ending.strip().lower() for ending in file_endings.split(",") if ending.strip()),
+        "path_patterns": [pattern.strip() for pattern in path_patterns.split(",") if pattern.strip()],
+        "skip_binary": skip_binary,
+        "max_size": max_size or None,
+    }
+
+def get_line_count_skip_reason(change, repo_path=".", cache=None, skip_rules=None):
+    """
+    Check whether the skip rules exclude the content of a changed file from being read.
+
+    The rules are checked in the order path pattern, file ending, binary marker and size. The size is taken from the
+    cache or `cat-file --batch-check`, so oversized contents are never read.
+
+    :param change: The file change as returned by `retrieve_commit_file_changes` or `parse_commit_log_records`.
+    :type change: dict
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param cache: Cache providing known blob sizes, see `retrieve_blob_stats`. Defaults to None.
+    :type cache: blob_cache.BlobStatsCache, optional
+    :param skip_rules: Rules built by `build_line_count_skip_rules`, defaults to None (read every content).
+    :type skip_rules: dict, optional
+
+    :return: The skip reason ("path", "file_ending", "binary" or "size"), or None if the content can be read.
+    :rtype: str or None
+    """
+    if not skip_rules:
+        return None
+
+    file_path = unquote_git_path(change["file_path"])
+    if any(fnmatch.fnmatchcase(file_path, pattern) for pattern in skip_rules["path_patterns"]):
+        return "path"
+    if skip_rules["file_endings"] and file_path.lower().endswith(skip_rules["file_endings"]):
+        return "file_ending"
+    if skip_rules["skip_binary"] and change.get("is_binary"):
+        return "binary"
+
+    max_size = skip_rules["max_size"]
+    if max_size is not None:
+        info = (cache.get(change["file_sha"]) if cache is not None else None) or get_object_reader(repo_path).object_info(change["file_sha"])
+        if info is not None and info["size"] > max_size:
+            return "size"
+    return None
+
+def retrieve_change_line_count(change, repo_path=".", cache=None, skip_rules=None):
+    """
+    Count the lines of a changed file after the commit, unless the skip rules exclude its content.
+
+    :param change: The file change as returned by `retrieve_commit_file_changes` or `parse_commit_log_records`.
+    :type change: dict
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param cache: Cache for the line counts, see `retrieve_blob_stats`. Defaults to None.
+    :type cache: blob_cache.BlobStatsCache, optional
+    :param skip_rules: Rules for contents that are not read, see `get_line_count_skip_reason`. Defaults to None.
+    :type skip_rules: dict, optional
+
+    :return: A tuple of the line count (None if skipped) and the skip reason (see `get_line_count_skip_reason`).
+    :rtype: tuple
+    """
+    # Deleted files have no content anymore
+    if not change["file_sha"] or change.get("file_mode") == SUBMODULE_MODE:
+        return 0, None
+
+    skip_reason = get_line_count_skip_reason(change, repo_path, cache=cache, skip_rules=skip_rules)
+    if skip_reason:
+        return None, skip_reason
+
+    return retrieve_blob_line_count(change["file_sha"], repo_path, cache=cache), None
+
+def derive_change_line_count(change, line_count_state, repo_path=".", cache=None, skip_rules=None):
+    """
+    Derive the line count of a changed file from its count before the commit and the lines added and removed.
+
+    `line_count_state` maps each path to the blob SHA and line count of its last processed version. If that blob is
+    the one the commit changed, the new count is derived from the numstat values. Otherwise (the path appears for the
+    first time, was renamed, or its last processed version is from another branch) and for binary files, the content
+    is read. Processing the commits parents first therefore avoids almost all content reads, but any order gives
+    correct counts.
+
+    The counts are physical lines as numstat counts them (line breaks, plus a last line without one). They differ
+    from `retrieve_change_line_count` for contents with leading or trailing blank lines, which it strips, and are
+    therefore stored as physical_line_count instead of line_count, see `add_file_line_counts`.
+
+    :param change: The file change as returned by `retrieve_commit_file_changes`.
+    :type change: dict
+    :param line_count_state: The state, updated in place.
+    :type line_count_state: dict
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param cache: Cache providing known blob sizes for the skip rules, defaults to None.
+    :type cache: blob_cache.BlobStatsCache, optional
+    :param skip_rules: Rules for contents that are not counted, see `get_line_count_skip_reason`. Defaults to None.
+    :type skip_rules: dict, optional
+
+    :return: A tuple of the line count (None if skipped) and the skip reason (see `get_line_count_skip_reason`).
+    :rtype: tuple
+    """
+    file_path = change["file_path"]
+    blob_sha = change["file_sha"]
+    if not blob_sha or change.get("file_mode") == SUBMODULE_MODE:
+        line_count_state.pop(file_path, None)
+        return 0, None
+
+    skip_reason = get_line_count_skip_reason(change, repo_path, cache=cache, skip_rules=skip_rules)
+    if skip_reason:
+        line_count_state.pop(file_path, None)
+        return None, skip_reason
+
+    known = line_count_state.get(file_path)
+    if known is not None and known[0] == change.get("old_file_sha") and not change.get("is_binary"):
+        line_count = known[1] + change["loc_added"] - change["loc_removed"]
+    else:
+        result = get_object_reader(repo_path).read_object(blob_sha)
+        content = result[1] if result is not None and result[0]["type"] == "blob" else b""
+        line_count = content.count(b"\n") + (1 if content and not content.endswith(b"\n") else 0)
+
+    line_count_state[file_path] = (blob_sha, line_count)
+    return line_count, None
+
+def retrieve_commit_files(commit_hash, repo_path=".", cache=None, skip_rules=None, line_count_state=None, pathspecs=None):
+    """
+    Retrieve the changed files of a commit together with their line counts, as stored in files.json.
+
+    :param commit_hash: The hash of the commit.
+    :type commit_hash: str
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param cache: Cache for the line counts, see `retrieve_blob_stats`. Defaults to None.
+    :type cache: blob_cache.BlobStatsCache, optional
+    :param skip_rules: Rules for files whose lines are not counted, see `get_line_count_skip_reason`. Defaults to None.
+    :type skip_rules: dict, optional
+    :param line_count_state: If given, physical line counts are derived from the previous counts (see
+                             `derive_change_line_count`) instead of line counts being read from the contents. Defaults
+                             to None.
+    :type line_count_state: dict, optional
+    :param pathspecs: Pathspecs limiting the files, see `build_pathspecs`. Defaults to None (all files).
+    :type pathspecs: list, optional
+
+    :return: The file changes as returned by `retrieve_commit_file_changes`, each with an additional line_count (or
+             physical_line_count with `line_count_state`) and line_count_skip_reason.
+    :rtype: list
+    """
+    return add_file_line_counts(retrieve_commit_file_changes(commit_hash, repo_path, pathspecs=pathspecs), repo_path, cache=cache, skip_rules=skip_rules, line_count_state=line_count_state)
+
+def iter_commit_files_bulk(commit_hashes, repo_path=".", cache=None, skip_rules=None, line_count_state=None, pathspecs=None):
+    """
+    Retrieve the changed files of many commits together with their line counts, see `retrieve_commit_files`.
+
+    The file changes come from a single `diff-tree` process, see `iter_commit_file_changes_bulk`.
+
+    :param commit_hashes: The full hashes of the commits.
+    :type commit_hashes: iterable
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param cache: Cache for the line counts, see `retrieve_blob_stats`. Defaults to None.
+    :type cache: blob_cache.BlobStatsCache, optional
+    :param skip_rules: Rules for files whose lines are not counted, see `get_line_count_skip_reason`. Defaults to None.
+    :type skip_rules: dict, optional
+    :param line_count_state: State for deriving the line counts, see `retrieve_commit_files`. Defaults to None.
+    :type line_count_state: dict, optional
+    :param pathspecs: Pathspecs limiting the files, see `build_pathspecs`. Defaults to None (all files).
+    :type pathspecs: list, optional
+
+    :return: A generator of (commit hash, file changes) tuples in the order of `commit_hashes`.
+    :rtype: generator
+    """
+    for commit_hash, file_changes in iter_commit_file_changes_bulk(commit_hashes, repo_path, pathspecs=pathspecs):
+        yield commit_hash, add_file_line_counts(file_changes, repo_path, cache=cache, skip_rules=skip_rules, line_count_state=line_count_state)
+
+def add_file_line_counts(file_changes, repo_path=".", cache=None, skip_rules=None, line_count_state=None):
+    """
+    Add line_count (physical_line_count with `line_count_state`) and line_count_skip_reason to the file changes of a
+    commit, see `retrieve_commit_files`.
+
+    :return: New dictionaries of the file changes with the additional keys.
+    :rtype: list
+    """
+    # Derived counts include leading and trailing blank lines, they must not be mistaken for the counted ones
+    count_key = "line_count" if line_count_state is None else "physical_line_count"
+    commit_files = []
+    for change in file_changes:
+        if line_count_state is not None:
+            line_count, skip_reason = derive_change_line_count(change, line_count_state, repo_path, cache=cache, skip_rules=skip_rules)
+        else:
+            line_count, skip_reason = retrieve_change_line_count(change, repo_path, cache=cache, skip_rules=skip_rules)
+
+        commit_files.append(change | {
+            count_key: line_count,
+            "line_count_skip_reason": skip_reason
+        })
+    return commit_files
+
+# State of a worker process of `iter_commit_files_parallel`, set up once per process by `init_commit_files_worker`
+commit_files_worker = {}
+
+def init_commit_files_worker(repo_path, cache_path, skip_rules=None, pathspecs=None):
+    """
+    Set up a worker process of `iter_commit_files_parallel` with its own blob stats cache connection.
+
+    The Git processes (object reader) are started per process on first use, see `get_object_reader`.
+    """
+    commit_files_worker["repo_path"] = repo_path
+    commit_files_worker["cache"] = BlobStatsCache(cache_path) if cache_path else None
+    commit_files_worker["skip_rules"] = skip_rules
+    commit_files_worker["pathspecs"] = pathspecs
+
+def retrieve_commit_files_batch(commit_hashes):
+    """
+    Retrieve the changed files of several commits in a worker process of `iter_commit_files_parallel`.
+
+    :return: A list of (commit hash, file changes) tuples in the order of the given commits.
+    :rtype: list
+    """
+    cache = commit_files_worker["cache"]
+    repo_path = commit_files_worker["repo_path"]
+    skip_rules = commit_files_worker["skip_rules"]
+    pathspecs = commit_files_worker["pathspecs"]
+    results = list(iter_commit_files_bulk(commit_hashes, repo_path, cache=cache, skip_rules=skip_rules, pathspecs=pathspecs))
+    # Workers may be terminated without running exit handlers, so the cache is persisted after every batch
+    if cache is not None:
+        cache.flush()
+    return results
+
+def iter_commit_files_parallel(commit_hashes, repo_path=".", workers=4, cache_path=None, skip_rules=None, batch_size=16, pathspecs=None):
+    """
+    Retrieve the changed files of many commits (see `retrieve_commit_files`) in a pool of worker processes.
+
+    Each worker owns its Git processes and cache connection. The commits are handed out in batches and the results
+    are yielded in the order of `commit_hashes`. Only `workers * 2` batches are in flight at a time, so memory does
+    not grow with the number of commits, even if the consumer is slower than the workers.
+
+    :param commit_hashes: The hashes of the commits.
+    :type commit_hashes: iterable
+    :param repo_path: Path to the local Git repository, defaults to ".".
+    :type repo_path: str, optional
+    :param workers: Number of worker processes, defaults to 4.
+    :type workers: int, optional
+    :param cache_path: Path to the blob stats cache (see `blob_cache.BlobStatsCache`), defaults to None (no cache).
+    :type cache_path: str, optional
+    :param skip_rules: Rules for files whose lines are not counted, see `get_line_count_skip_reason`. Defaults to None.
+    :type skip_rules: dict, optional
+    :param batch_size: Number of commits per batch, defaults to 16.
+    :type batch_size: int, optional
+    :param pathspecs: Pathspecs limiting the files, see `build_pathspecs`. Defaults to None (all files).
+    :type pathspecs: list, optional
+
+    :return: A generator of (commit hash, file changes) tuples.
+    :rtype: generator
+    """
+    commit_iterator = iter(commit_hashes)
+    batches = iter(lambda: list(itertools.islice(commit_iterator, batch_size)), [])
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_commit_files_worker, initargs=(repo_path, cache_path, skip_rules, pathspecs)) as executor:
+        # Keep a bounded window of batches in flight and consume them in order
+        pending = collections.deque()
+        for batch in itertools.islice(batches, workers * 2):
+            pending.append(executor.submit(retrieve_commit_files_batch, batch))
+
+        while pending:
+            results = pending.popleft().result()
+            next_batch = next(batches, None)
+            if next_batch is not None:
+                pending.append(executor.submit(retrieve_commit_files_batch, next_batch))
+
+            yield from results
 
 def retrieve_pull_requests(repo_path):
     """
@@ -1094,6 +2996,7 @@ def retrieve_pull_requests(repo_path):
 
     pull_requests = []
     if pr_refs_output:
+        commit_graph = load_commit_graph(repo_path)
         for ref in pr_refs_output.splitlines():
             counter += 1
             if counter % 100 == 0:
@@ -1116,10 +3019,9 @@ def retrieve_pull_requests(repo_path):
                 merge_commit_output = run_git_command(merge_commit_args, repo_path=repo_path)
                 merge_commit_sha = merge_commit_output.strip().split('\n')[0] if merge_commit_output else None
 
-                # Get the list of commits contained in the pull request
-                commits_args = ["rev-list", "--first-parent", f'{merge_commit_sha}^1..{merge_commit_sha}^2'] if merge_commit_sha else []
-                commits_output = run_git_command(commits_args, repo_path=repo_path) if commits_args else ""
-                commits = commits_output.strip().split('\n') if commits_output else []
+                # Get the list of commits contained in the pull request, like `rev-list --first-parent <merge>^1..<merge>^2`
+                merge_parents = commit_graph.parents(merge_commit_sha) if merge_commit_sha and merge_commit_sha in commit_graph else []
+                commits = commit_graph.walk([f"^{merge_parents[0]}", merge_parents[1]], first_parent=True) if len(merge_parents) > 1 else []
 
                 # Get diff statistics
                 diff_stats_args = ["diff", "--shortstat", f'{merge_commit_sha}^1..{merge_commit_sha}'] if merge_commit_sha else []
@@ -0,0 +1,38 @@
+import os
+import logging
+from dotenv import load_dotenv
+from helper.git_console_access import retrieve_repository_features, time_probe_commands, optimize_repository
+
+load_dotenv(override=True)
+
+# Setup
+REPO_PATH = os.getenv('REPO_PATH')
+REPO = os.getenv('REPO')
+OPTIMIZE_REPOSITORY = os.getenv('OPTIMIZE_REPOSITORY', 'false').lower() == 'true'
+
+def log_timings(label, timings):
+    for name, seconds in timings.items():
+        logging.info(f"{label} {name}: {seconds:.3f}s")
+
+# Check the repository before crawling
+features = retrieve_repository_features(REPO_PATH)
+logging.info(f"Repository features of {REPO}: {features}")
+missing = features['pack_count'] > 1 or not (features['commit_graph'] and features['changed_paths'] and features['multi_pack_index'])
+
+if not missing:
+    logging.info(f"{REPO} is already optimized.")
+elif not OPTIMIZE_REPOSITORY:
+    logging.warning(f"{REPO} has no complete commit-graph, Bloom filters or multi-pack-index. Set OPTIMIZE_REPOSITORY=true to write them before crawling.")
+else:
+    before = time_probe_commands(REPO_PATH)
+    log_timings("Before", before)
+
+    if optimize_repository(REPO_PATH):
+        after = time_probe_commands(REPO_PATH)
+        log_timings("After", after)
+        for name, seconds in after.items():
+            if seconds > 0:
+                logging.info(f"Speedup {name}: {before[name] / seconds:.1f}x")
+        logging.info(f"Repository features of {REPO}: {retrieve_repository_features(REPO_PATH)}")
+    else:
+        logging.error(f"Optimizing {REPO} failed, crawling continues without it.")
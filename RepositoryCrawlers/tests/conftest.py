@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The crawler scripts import the helpers as a top-level package, so do the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
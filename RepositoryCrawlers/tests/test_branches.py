@@ -0,0 +1,46 @@
+import subprocess
+
+from helper.git_console_access import find_merge_commits
+
+
+def git(repo_path, *args):
+    """
+    Run a Git command with a fixed identity and return its output.
+    """
+    return subprocess.run(
+        ["git", "-c", "user.name=Tester", "-c", "user.email=tester@example.com", *args],
+        cwd=repo_path, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def commit_file(repo_path, name):
+    (repo_path / name).write_text(f"{name}\n")
+    git(repo_path, "add", name)
+    git(repo_path, "commit", "-q", "-m", f"Add {name}")
+
+
+def test_find_merge_commits(tmp_path):
+    git(tmp_path, "init", "-q", "-b", "main")
+    commit_file(tmp_path, "base.txt")
+
+    git(tmp_path, "checkout", "-q", "-b", "fast-forward")
+    commit_file(tmp_path, "fast-forward.txt")
+    git(tmp_path, "checkout", "-q", "main")
+    git(tmp_path, "merge", "-q", "--ff-only", "fast-forward")
+
+    git(tmp_path, "checkout", "-q", "-b", "feature")
+    commit_file(tmp_path, "feature.txt")
+    git(tmp_path, "checkout", "-q", "main")
+    commit_file(tmp_path, "main.txt")
+    git(tmp_path, "merge", "-q", "--no-ff", "-m", "Merge feature", "feature")
+
+    # Points to the same commit as HEAD
+    git(tmp_path, "branch", "at-head")
+
+    merge_commits = find_merge_commits(["fast-forward", "feature", "at-head", "main"], repo_path=str(tmp_path))
+
+    # Tips on the first-parent history of HEAD, including HEAD itself, are "directly on this branch"
+    assert merge_commits["fast-forward"] is None
+    assert merge_commits["at-head"] is None
+    assert merge_commits["main"] is None
+    assert merge_commits["feature"] == git(tmp_path, "rev-parse", "HEAD")
@@ -0,0 +1,51 @@
+import subprocess
+
+from helper.git_console_access import retrieve_pull_requests
+
+
+def git(repo_path, *args):
+    """
+    Run a Git command with a fixed identity and return its output.
+    """
+    return subprocess.run(
+        ["git", "-c", "user.name=Tester", "-c", "user.email=tester@example.com", *args],
+        cwd=repo_path, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+def create_origin(origin_path):
+    """
+    Create a repository with two pull request refs: #1 merged into main, #2 without a merge commit.
+    """
+    origin_path.mkdir()
+    git(origin_path, "init", "-q", "-b", "main")
+    (origin_path / "file.txt").write_text("base\n")
+    git(origin_path, "add", "file.txt")
+    git(origin_path, "commit", "-q", "-m", "Initial commit")
+
+    for number in (1, 2):
+        git(origin_path, "checkout", "-q", "-b", f"feature-{number}", "main")
+        (origin_path / f"feature-{number}.txt").write_text(f"feature {number}\n")
+        git(origin_path, "add", f"feature-{number}.txt")
+        git(origin_path, "commit", "-q", "-m", f"Feature {number}")
+        git(origin_path, "update-ref", f"refs/pull/{number}/head", "HEAD")
+
+    git(origin_path, "checkout", "-q", "main")
+    git(origin_path, "merge", "-q", "--no-ff", "-m", "Merge pull request #1", "feature-1")
+
+
+def test_retrieve_pull_requests_without_merge_commit(tmp_path):
+    origin_path = tmp_path / "origin"
+    create_origin(origin_path)
+    git(tmp_path, "clone", "-q", str(origin_path), "clone")
+
+    pull_requests = {pull_request["number"]: pull_request for pull_request in retrieve_pull_requests(str(tmp_path / "clone"))}
+
+    assert pull_requests["2"]["merge_commit_sha"] is None
+    assert pull_requests["2"]["commits"] == []
+    assert pull_requests["2"]["files_changed"] == 0
+
+    feature_sha = git(origin_path, "rev-parse", "feature-1")
+    assert pull_requests["1"]["merge_commit_sha"] == git(origin_path, "rev-parse", "main")
+    assert pull_requests["1"]["commits"] == [feature_sha]
+    assert pull_requests["1"]["files_changed"] == 1
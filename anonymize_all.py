@@ -69,8 +69,8 @@ for csv_file in csv_files:
     df.to_csv(anonymized_path, index=False)
     print(f"Saved anonymized file to {anonymized_path}")
 
-# Copy JSON files from source to goal directory
-json_files = glob.glob(os.path.join(STORAGE_PATH, '*.json'))
+# Copy JSON files from source to goal directory, including the file-level data in files.jsonl
+json_files = glob.glob(os.path.join(STORAGE_PATH, '*.json')) + glob.glob(os.path.join(STORAGE_PATH, '*.jsonl'))
 os.makedirs(TARGET_PATH, exist_ok=True)
 for json_file in json_files:
     target_path = os.path.join(TARGET_PATH, os.path.basename(json_file))
@@ -22,10 +22,10 @@ fi
 pip install -r requirements.txt
 
 # Read the file line by line
-while IFS="," read -r access_token repo_path storage_path owner repo main_branch endpoint mode project;
+while IFS="," read -r access_token repo_path storage_path owner repo main_branch endpoint mode project file_include_paths file_exclude_paths;
 do
     # Trim leading/trailing whitespace
-    line="${access_token}${repo_path}${storage_path}${owner}${repo}${main_branch}${endpoint}${mode}${project}"
+    line="${access_token}${repo_path}${storage_path}${owner}${repo}${main_branch}${endpoint}${mode}${project}${file_include_paths}${file_exclude_paths}"
 
     # Skip empty or whitespace-only lines
     [[ -z "$line" ]] && continue
@@ -47,11 +47,16 @@ ENDPOINT=$endpoint
 MODE=$mode
 PROJECT=$project
 VIRTUAL_ENVIRONMENT_PATH=$VENV_PATH/bin
+BLOB_STATS_CACHE_PATH=$storage_path/blob_stats.sqlite
 EOF
+    # Path patterns are separated by ";" in the CSV, only set if given so exported values still apply
+    [[ -n "$file_include_paths" ]] && echo "FILE_INCLUDE_PATHS=${file_include_paths//;/,}" >> ".env"
+    [[ -n "$file_exclude_paths" ]] && echo "FILE_EXCLUDE_PATHS=${file_exclude_paths//;/,}" >> ".env"
 
     echo "Running scripts for $repo" 2>&1 | tee -a "$LOGFILE"
 
     # Run the Python script inside the repo folder
+    python3 "./RepositoryCrawlers/prepare_repository.py" 2>&1 | tee -a "$LOGFILE"
     python3 "./RepositoryCrawlers/generate_branch_data.py" 2>&1 | tee -a "$LOGFILE"
     python3 "./RepositoryCrawlers/generate_commit_data.py" 2>&1 | tee -a "$LOGFILE"
     python3 "./RepositoryCrawlers/generate_build_data.py" 2>&1 | tee -a "$LOGFILE"
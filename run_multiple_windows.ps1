@@ -35,6 +35,8 @@ Get-Content $INPUT_FILE | ForEach-Object {
     $endpoint = $fields[6]
     $mode = $fields[7]
     $project = $fields[8]
+    $file_include_paths = $fields[9]
+    $file_exclude_paths = $fields[10]
 
     # Create a folder based on the repo name inside the destination folder
     $STORAGE_FOLDER = "$storage_path\$repo"
@@ -55,11 +57,16 @@ ENDPOINT=$endpoint
 MODE=$mode
 PROJECT=$project
 VIRTUAL_ENVIRONMENT_PATH=$VENV_PATH\Scripts
+BLOB_STATS_CACHE_PATH=$storage_path\blob_stats.sqlite
 "@ | Out-File -Encoding utf8 -FilePath ".env"
+    # Path patterns are separated by ";" in the CSV, only set if given so exported values still apply
+    if ($file_include_paths) { "FILE_INCLUDE_PATHS=$($file_include_paths -replace ';', ',')" | Out-File -Encoding utf8 -Append -FilePath ".env" }
+    if ($file_exclude_paths) { "FILE_EXCLUDE_PATHS=$($file_exclude_paths -replace ';', ',')" | Out-File -Encoding utf8 -Append -FilePath ".env" }
 
     Write-Host "Running scripts for $repo"
 
     # Run the Python scripts inside the repo folder
+    & python "./RepositoryCrawlers/prepare_repository.py"
     & python "./RepositoryCrawlers/generate_branch_data.py"
     & python "./RepositoryCrawlers/generate_commit_data.py"
     & python "./RepositoryCrawlers/generate_build_data.py"